@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+"""
+Micro-benchmarks of pyaudio_wrapper.dsp against the audioop baseline.
+"""
+
+from __future__ import print_function
+import argparse
+import timeit
+import warnings
+import numpy as np
+from pyaudio_wrapper import dsp
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop # removed from the standard library in Python 3.13
+    except ImportError:
+        audioop = None
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-s", type = float, default = 60, dest = "seconds", help = "length of the signal in seconds")
+parser.add_argument("-n", type = int, default = 10, dest = "n", help = "number of repeats")
+
+RATE = 44100
+
+def bench(name, fun, n):
+    best = min(timeit.repeat(fun, number = 1, repeat = n))
+    print("{:<32}{:>10.3f} ms".format(name, best * 1000))
+
+def main(args):
+    for bit_width, dtype in [(1, np.int8), (2, np.int16), (4, np.int32)]:
+        info = np.iinfo(dtype)
+        samples = np.random.randint(info.min // 4, info.max // 4, int(args.seconds * RATE)).astype(dtype)
+        byte_data = samples.tobytes()
+        print("== {} bits, {} seconds".format(8 * bit_width, args.seconds))
+
+        if audioop is not None:
+            assert abs(audioop.rms(byte_data, bit_width) - dsp.rms(byte_data, bit_width)) <= 1
+            bench("audioop.rms", lambda: audioop.rms(byte_data, bit_width), args.n)
+        bench("dsp.rms", lambda: dsp.rms(byte_data, bit_width), args.n)
+
+        if audioop is not None:
+            bench("audioop.mul", lambda: audioop.mul(byte_data, bit_width, 3.5), args.n)
+        bench("dsp.gain", lambda: dsp.gain(byte_data, 3.5, bit_width), args.n)
+
+        if audioop is not None:
+            bench("audioop.max", lambda: audioop.max(byte_data, bit_width), args.n)
+        bench("dsp.peak", lambda: dsp.peak(byte_data, bit_width), args.n)
+
+        if audioop is not None:
+            bench("audioop.avg", lambda: audioop.avg(byte_data, bit_width), args.n)
+        bench("dsp.dc_offset", lambda: dsp.dc_offset(byte_data, bit_width), args.n)
+        bench("dsp.zero_crossing_rate", lambda: dsp.zero_crossing_rate(byte_data, bit_width), args.n)
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    main(args)
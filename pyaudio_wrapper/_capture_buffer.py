@@ -0,0 +1,87 @@
+__all__ = ["CaptureBuffer"]
+__doc__ = """A growable buffer for recorded frames.
+"""
+
+class CaptureBuffer(object):
+    """
+    A bytearray the recorded frames are read into directly.
+
+    A region is reserved, filled by the source and then committed, or left
+    uncommitted to be reused by the next reservation. The bytearray starts
+    with `initial_frames` frames and grows by half when needed, up to
+    `max_frames` frames. `finish` trims the unused capacity in place and
+    returns the bytearray, so the recorded frames are never copied into a
+    final bytes object.
+    """
+
+    def __init__(self, frame_width, initial_frames, max_frames = None):
+
+        assert initial_frames > 0, "`initial_frames` must be positive."
+        self.__frame_width = frame_width
+        self.__max_bytes = None if max_frames is None else max_frames * frame_width
+        if max_frames is not None:
+            initial_frames = min(initial_frames, max_frames)
+        self.__buffer = bytearray(initial_frames * frame_width)
+        self.__size = 0
+        self.__region = None
+
+    @property
+    def num_frames(self):
+        return self.__size // self.__frame_width
+
+    @property
+    def full(self):
+        return self.__max_bytes is not None and self.__size >= self.__max_bytes
+
+    def reserve(self, num_frames):
+        """
+        Return a writable view of the next `num_frames` frames. There may be
+        fewer of them if the buffer reaches its maximum size.
+        """
+
+        self.__release_region()
+        nbytes = num_frames * self.__frame_width
+        if self.__max_bytes is not None:
+            nbytes = min(nbytes, self.__max_bytes - self.__size)
+
+        if self.__size + nbytes > len(self.__buffer):
+            # Grow by half, copying the committed frames only.
+            capacity = max(self.__size + nbytes, len(self.__buffer) * 3 // 2)
+            if self.__max_bytes is not None:
+                capacity = min(capacity, self.__max_bytes)
+            capacity -= capacity % self.__frame_width
+            buffer = bytearray(capacity)
+            buffer[:self.__size] = memoryview(self.__buffer)[:self.__size]
+            self.__buffer = buffer
+
+        self.__region = memoryview(self.__buffer)[self.__size:self.__size + nbytes]
+        return self.__region
+
+    def commit(self, nbytes = None):
+        """
+        Keep the frames of the last reserved region, or only the whole
+        frames of its first `nbytes` bytes.
+        """
+
+        if self.__region is not None:
+            if nbytes is None:
+                self.__size += len(self.__region)
+            else:
+                nbytes = min(int(nbytes), len(self.__region))
+                self.__size += nbytes - nbytes % self.__frame_width
+        self.__release_region()
+
+    def finish(self):
+        """
+        Return the bytearray of the committed frames.
+        """
+
+        self.__release_region()
+        del self.__buffer[self.__size:]
+        return self.__buffer
+
+    def __release_region(self):
+
+        if self.__region is not None:
+            self.__region.release()
+            self.__region = None
@@ -0,0 +1,100 @@
+__all__ = ["MinMaxPyramid"]
+__doc__ = """Level-of-detail min/max envelopes for plotting long signals.
+"""
+
+import numpy as np
+
+class MinMaxPyramid(object):
+    """
+    Multi-resolution min/max envelopes of a 1-D signal.
+
+    Level 0 holds the min and max of every `base_bucket` samples. Each level
+    above groups `factor` buckets of the level below. Any range of the signal
+    can then be decimated to a given number of points in time independent
+    of the length of the signal.
+    """
+
+    def __init__(self, samples, base_bucket = 64, factor = 4, block_size = 1 << 22):
+
+        assert base_bucket > 0 and factor > 1, "`base_bucket` must be positive and `factor` larger than 1."
+
+        self.__samples = samples
+        self.__bucket_sizes = []
+        self.__levels = []
+
+        # Level 0 is computed block by block to bound the temporary arrays.
+        block_size -= block_size % base_bucket
+        mins, maxs = [], []
+        for start in range(0, len(samples), block_size):
+            block_min, block_max = self.__reduce(samples[start:start + block_size], base_bucket)
+            mins.append(block_min)
+            maxs.append(block_max)
+        if mins:
+            self.__append_level(base_bucket, np.concatenate(mins), np.concatenate(maxs))
+
+        while self.__levels and len(self.__levels[-1][0]) > 1:
+            level_min, level_max = self.__levels[-1]
+            self.__append_level(self.__bucket_sizes[-1] * factor,
+                                self.__reduce(level_min, factor)[0],
+                                self.__reduce(level_max, factor)[1])
+
+    @staticmethod
+    def __reduce(array, size):
+        """
+        Min and max of every `size` items of `array`. The last group may be smaller.
+        """
+
+        num_full = len(array) // size
+        head = array[:num_full * size].reshape((num_full, size))
+        mins, maxs = head.min(axis = 1), head.max(axis = 1)
+        if len(array) % size:
+            tail = array[num_full * size:]
+            mins = np.append(mins, tail.min())
+            maxs = np.append(maxs, tail.max())
+        return mins, maxs
+
+    def __append_level(self, bucket_size, mins, maxs):
+
+        self.__bucket_sizes.append(bucket_size)
+        self.__levels.append((mins, maxs))
+
+    def __len__(self):
+        return len(self.__samples)
+
+    def envelope(self, start, stop, num_buckets):
+        """
+        Decimate the samples from `start` to `stop` (exclusive) into about
+        `num_buckets` buckets.
+
+        return:
+            (index, values): sample indices and values to be plotted as a line.
+            Each bucket contributes its min and max, so the line covers the
+            whole amplitude range of the bucket. If the range is short enough,
+            the raw samples are returned instead.
+        """
+
+        start, stop = max(0, int(start)), min(len(self), int(stop))
+        if stop <= start:
+            return np.empty(0, dtype = np.intp), np.empty(0, dtype = self.__samples.dtype)
+
+        wanted = (stop - start) // max(num_buckets, 1)
+        if not self.__levels or wanted < self.__bucket_sizes[0]:
+            return np.arange(start, stop), self.__samples[start:stop]
+
+        # The coarsest level whose buckets are not larger than wanted.
+        level = max(i for i, size in enumerate(self.__bucket_sizes) if size <= wanted)
+        size = self.__bucket_sizes[level]
+        level_min, level_max = self.__levels[level]
+        first, last = start // size, -(-stop // size)
+
+        # Merge buckets of this level to get about `num_buckets` of them.
+        group = max(1, wanted // size)
+        mins = self.__reduce(level_min[first:last], group)[0]
+        maxs = self.__reduce(level_max[first:last], group)[1]
+
+        index = np.arange(first * size, last * size, group * size)[:len(mins)]
+        index = np.clip(np.repeat(index, 2), start, stop - 1)
+        values = np.empty(2 * len(mins), dtype = mins.dtype)
+        values[0::2] = mins
+        values[1::2] = maxs
+        return index, values
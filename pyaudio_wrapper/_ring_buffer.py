@@ -0,0 +1,146 @@
+__all__ = ["RingBuffer"]
+__doc__ = """A preallocated ring buffer of bytes for audio callbacks.
+"""
+
+import threading
+import numpy as np
+
+class RingBuffer(object):
+    """
+    A fixed-size ring buffer of bytes shared by one writer thread and one
+    reader thread without a lock.
+
+    The writer only moves the write position and the reader only moves the
+    read position. Data which does not fit is dropped and counted instead of
+    overwriting the data not read yet, so the writer never waits.
+    """
+
+    def __init__(self, capacity):
+
+        assert capacity > 0, "`capacity` must be positive."
+        self.__buffer = np.zeros(capacity, dtype = np.uint8)
+        self.__written = 0       # total number of bytes written
+        self.__read = 0          # total number of bytes read
+        self.__overflow_count = 0
+        self.__dropped_bytes = 0
+        self.__data_ready = threading.Event()
+
+    @property
+    def capacity(self):
+        return len(self.__buffer)
+
+    @property
+    def available(self):
+        """
+        Number of bytes ready to be read.
+        """
+        return self.__written - self.__read
+
+    @property
+    def overflow_count(self):
+        """
+        Number of writes which did not fit entirely.
+        """
+        return self.__overflow_count
+
+    @property
+    def dropped_bytes(self):
+        return self.__dropped_bytes
+
+    def write(self, data):
+        """
+        Copy `data` into the buffer. Called by the writer thread only.
+
+        return:
+            The number of bytes written.
+        """
+
+        data = np.frombuffer(data, dtype = np.uint8)
+        free = self.capacity - self.available
+        if len(data) > free:
+            self.__overflow_count += 1
+            self.__dropped_bytes += len(data) - free
+            data = data[:free]
+
+        start = self.__written % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.__buffer[start:start + first] = data[:first]
+        self.__buffer[:len(data) - first] = data[first:]
+
+        # Publish the data once it is copied.
+        self.__written += len(data)
+        self.__data_ready.set()
+        return len(data)
+
+    def __get_ranges(self, nbytes):
+
+        nbytes = min(nbytes, self.available)
+        start = self.__read % self.capacity
+        first = min(nbytes, self.capacity - start)
+        return nbytes, start, first
+
+    def readinto(self, buffer):
+        """
+        Copy the available bytes into the writable `buffer`, as much as it
+        can hold. Called by the reader thread only.
+
+        return:
+            The number of bytes copied.
+        """
+
+        out = np.frombuffer(buffer, dtype = np.uint8)
+        nbytes, start, first = self.__get_ranges(len(out))
+        out[:first] = self.__buffer[start:start + first]
+        out[first:nbytes] = self.__buffer[:nbytes - first]
+
+        self.__read += nbytes
+        return nbytes
+
+    def read(self, nbytes):
+        """
+        Return at most `nbytes` available bytes. Called by the reader thread only.
+        """
+
+        nbytes, start, first = self.__get_ranges(nbytes)
+        data = b"".join((memoryview(self.__buffer[start:start + first]),
+                         memoryview(self.__buffer[:nbytes - first])))
+
+        self.__read += nbytes
+        return data
+
+    def wait(self, nbytes, timeout = None):
+        """
+        Wait until `nbytes` bytes are available.
+
+        return:
+            False if `timeout` (in seconds) expired first.
+
+        Raise:
+            ValueError if `nbytes` is larger than the capacity, since it
+            would wait forever.
+        """
+
+        if nbytes > self.capacity:
+            raise ValueError("Can not wait for {} bytes in a ring buffer of {} bytes.".format(nbytes, self.capacity))
+        while self.available < nbytes:
+            self.__data_ready.clear()
+            # Data may have been written before the event was cleared.
+            if self.available >= nbytes:
+                break
+            if not self.__data_ready.wait(timeout):
+                return False
+        return True
+
+    def skip(self, nbytes):
+        """
+        Discard at most `nbytes` of the oldest bytes. Called by the reader thread only.
+        """
+
+        self.__read += max(0, min(nbytes, self.available))
+
+    def clear(self):
+        """
+        Discard the bytes not read yet. Called by the reader thread only.
+        """
+
+        self.__read = self.__written
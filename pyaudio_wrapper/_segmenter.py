@@ -0,0 +1,316 @@
+__all__ = ["NoiseFloorTracker", "UtteranceSegmenter"]
+__doc__ = """Incremental speech/silence segmentation of captured audio.
+"""
+
+import math
+import numpy as np
+
+from . import dsp
+from ._capture_buffer import CaptureBuffer
+from ._ring_buffer import RingBuffer
+
+class NoiseFloorTracker(object):
+    """
+    Track the noise floor of a stream of energies with an exponential moving
+    percentile of their logarithm.
+
+    For each update, the estimate moves towards the new energy by
+    `adapt_rate * percentile / 100` per second when the energy is above it,
+    and by `adapt_rate * (1 - percentile / 100)` per second when it is below,
+    without passing it. It thus settles at the `percentile`-th percentile:
+    it drops quickly in pauses and rises slowly during speech or when the
+    room gets noisier.
+    """
+
+    def __init__(self, percentile = 10, adapt_rate = 3., initial = None):
+
+        assert 0 < percentile < 100, "`percentile` must be between 0 and 100."
+        self.__quantile = percentile / 100.
+        self.__adapt_rate = adapt_rate
+        self.__log_floor = None if initial is None else self.__log(initial)
+
+    @staticmethod
+    def __log(energy):
+        return math.log(max(energy, 1e-6))
+
+    @property
+    def floor(self):
+        """
+        The current noise floor, or None before the first update.
+        """
+        return None if self.__log_floor is None else math.exp(self.__log_floor)
+
+    def update(self, energy, duration):
+        """
+        Update the noise floor with the `energy` of `duration` seconds of audio.
+        """
+
+        log_energy = self.__log(energy)
+        if self.__log_floor is None:
+            self.__log_floor = log_energy
+        elif log_energy > self.__log_floor:
+            step = self.__adapt_rate * duration * self.__quantile
+            self.__log_floor = min(self.__log_floor + step, log_energy)
+        else:
+            step = self.__adapt_rate * duration * (1. - self.__quantile)
+            self.__log_floor = max(self.__log_floor - step, log_energy)
+
+
+class UtteranceSegmenter(object):
+    """
+    A voice activity state machine fed chunk by chunk.
+
+    Each chunk is read into the region returned by `reserve`, then `process`
+    updates the state. The decisions are made on analysis frames of
+    `frame_ms` milliseconds, whose energies are computed in one pass per
+    chunk, so utterances start and end at frame precision whatever the
+    chunk size.
+
+    While waiting for sound, the audio is kept in a pre-roll ring buffer of
+    the last `pre_roll` seconds. At the onset, the pre-roll is copied into a
+    new CaptureBuffer, and the following chunks are read into it directly.
+    The utterance ends once the silence lasts `hangover` seconds, or when it
+    reaches `max_duration` seconds.
+
+    With `energy_threshold = None`, the threshold adapts continuously: it is
+    `threshold_ratio` times the noise floor followed by a NoiseFloorTracker,
+    and not less than `min_threshold_db` dB below full scale.
+    """
+
+    def __init__(self, sample_rate, bit_width, channels, energy_threshold = None, hangover = 1.,
+                 pre_roll = 0., max_duration = None, threshold_ratio = 3., min_threshold_db = -70.,
+                 noise_floor = None, frame_ms = 20):
+
+        self.__sample_rate = sample_rate
+        self.__bit_width = bit_width
+        self.__channels = channels
+        self.__frame_width = bit_width * channels
+        self.__frame_length = max(1, int(round(frame_ms * sample_rate / 1000.)))
+        self.__energy_threshold = energy_threshold
+        self.__threshold_ratio = threshold_ratio
+        self.__min_threshold = 2 ** (8 * bit_width - 1) * 10 ** (min_threshold_db / 20.)
+        self.__noise_floor = NoiseFloorTracker(initial = noise_floor) if energy_threshold is None else None
+        self.__hangover_frames = int(round(hangover * sample_rate))
+        self.__max_frames = None if max_duration is None else int(max_duration * sample_rate)
+
+        pre_roll_frames = int(round(pre_roll * sample_rate))
+        self.__pre_roll = RingBuffer(pre_roll_frames * self.__frame_width) if pre_roll_frames > 0 else None
+
+        self.__chunk = bytearray()  # the chunk read while waiting for sound
+        self.__capture = None       # the utterance being captured
+        self.__region = None
+        self.__silent_frames = 0
+        self.__truncated = False
+
+    @property
+    def energy_threshold(self):
+        """
+        The current energy threshold. None if it is adaptive and no data has
+        been processed yet.
+        """
+
+        if self.__noise_floor is None:
+            return self.__energy_threshold
+        floor = self.__noise_floor.floor
+        if floor is None:
+            return None
+        return max(self.__threshold_ratio * floor, self.__min_threshold)
+
+    @property
+    def noise_floor(self):
+        """
+        The current noise floor if the threshold is adaptive, None otherwise.
+        """
+        return None if self.__noise_floor is None else self.__noise_floor.floor
+
+    @property
+    def in_speech(self):
+        """
+        Whether an utterance is being captured.
+        """
+        return self.__capture is not None
+
+    def reserve(self, num_frames):
+        """
+        Return a writable buffer for the next `num_frames` frames.
+        """
+
+        if self.__capture is not None:
+            self.__region = self.__capture.reserve(num_frames)
+        else:
+            nbytes = num_frames * self.__frame_width
+            if len(self.__chunk) != nbytes:
+                self.__chunk = bytearray(nbytes)
+            self.__region = memoryview(self.__chunk)
+        return self.__region
+
+    def process(self):
+        """
+        Process the frames read into the last reserved buffer.
+
+        return:
+            The list of the bytearrays of the utterances which ended, usually
+            empty.
+        """
+
+        data, self.__region = self.__region, None
+        energies, sizes = self.__frame_energies(data)
+        thresholds = self.__track(energies, sizes)
+        loud = energies > thresholds
+        quiet = energies < thresholds
+
+        # Byte offset of each analysis frame in `data`.
+        offsets = np.r_[0, np.cumsum(sizes)] * self.__frame_width
+        # While in speech, `data` is the uncommitted region of the capture.
+        in_place = self.__capture is not None
+
+        utterances = []
+        position = 0
+        while position < len(sizes):
+            if self.__capture is None:
+                onsets = np.flatnonzero(loud[position:])
+                if len(onsets) == 0:
+                    self.__push_pre_roll(data[offsets[position]:])
+                    break
+                onset = position + onsets[0]
+                self.__push_pre_roll(data[offsets[position]:offsets[onset]])
+                self.__start()
+                position = onset
+
+            end = self.__find_end(quiet, sizes, position)
+            stop = len(sizes) if end is None else end
+            if in_place:
+                if end is not None:
+                    # The rest of the chunk is processed after the utterance is done.
+                    data = memoryview(bytes(data))
+                self.__capture.commit(offsets[stop])
+                in_place = False
+            else:
+                stop = self.__append(data[offsets[position]:offsets[stop]], position, offsets)
+
+            if end is not None or self.__capture.full:
+                utterances.append(self.__finish())
+            position = stop
+
+        if in_place:
+            self.__capture.commit()
+        return utterances
+
+    def skip(self):
+        """
+        Discard the frames read into the last reserved buffer. They are only
+        used to follow the noise floor.
+        """
+
+        data, self.__region = self.__region, None
+        self.__track(*self.__frame_energies(data))
+
+    def __frame_energies(self, data):
+        """
+        return:
+            (energies, sizes): the rms and the number of frames of each
+            analysis frame of `data`.
+        """
+
+        num_frames = len(data) // self.__frame_width
+        energies = dsp.frame_rms(data, self.__frame_length, bit_width = self.__bit_width,
+                                 channels = self.__channels)
+        sizes = np.full(len(energies), self.__frame_length)
+        if len(sizes):
+            sizes[-1] = num_frames - self.__frame_length * (len(sizes) - 1)
+        return energies, sizes
+
+    def __track(self, energies, sizes):
+        """
+        Update the noise floor with the analysis frames.
+
+        return:
+            The threshold of each frame, as it was before the frame updated
+            the noise floor.
+        """
+
+        if self.__noise_floor is None:
+            return np.full(len(energies), self.__energy_threshold, dtype = np.float64)
+
+        thresholds = np.empty(len(energies))
+        for index, (energy, size) in enumerate(zip(energies, sizes)):
+            if self.__noise_floor.floor is None:
+                # Start from the first frame, without any calibration pause.
+                self.__noise_floor.update(energy, 0.)
+            thresholds[index] = self.energy_threshold
+            self.__noise_floor.update(energy, float(size) / self.__sample_rate)
+        return thresholds
+
+    def __find_end(self, quiet, sizes, position):
+        """
+        Count the silent frames from the analysis frame `position`.
+
+        return:
+            The index of the analysis frame after the one completing the
+            hangover, or None if the utterance goes on.
+        """
+
+        for index in range(position, len(sizes)):
+            if quiet[index]:
+                self.__silent_frames += sizes[index]
+            else:
+                self.__silent_frames = 0
+            if self.__silent_frames >= self.__hangover_frames:
+                return index + 1
+        return None
+
+    def __append(self, data, position, offsets):
+        """
+        Copy `data`, starting at the analysis frame `position`, into the
+        capture. It may not fit entirely if the capture reaches `max_duration`.
+
+        return:
+            The index of the analysis frame after the data copied. The rest of
+            a partly copied frame goes to the pre-roll.
+        """
+
+        region = self.__capture.reserve(len(data) // self.__frame_width)
+        region[:] = data[:len(region)]
+        nbytes = len(region)
+        self.__capture.commit()
+        if nbytes == len(data):
+            return position + np.searchsorted(offsets[position:], offsets[position] + nbytes)
+
+        stop = position + np.searchsorted(offsets[position:], offsets[position] + nbytes, side = "right")
+        if self.__pre_roll is not None:
+            self.__pre_roll.clear()
+            self.__push_pre_roll(data[nbytes:offsets[stop] - offsets[position]])
+        return stop
+
+    @property
+    def truncated(self):
+        """
+        Whether the last utterance was cut at `max_duration`.
+        """
+        return self.__truncated
+
+    def __start(self):
+
+        capture = CaptureBuffer(self.__frame_width, self.__sample_rate, self.__max_frames)
+        if self.__pre_roll is not None:
+            self.__pre_roll.readinto(capture.reserve(self.__pre_roll.available // self.__frame_width))
+            capture.commit()
+
+        self.__capture = capture
+        self.__silent_frames = 0
+        self.__truncated = False
+
+    def __push_pre_roll(self, data):
+
+        pre_roll = self.__pre_roll
+        if pre_roll is None:
+            return
+        data = data[max(len(data) - pre_roll.capacity, 0):]
+        pre_roll.skip(pre_roll.available + len(data) - pre_roll.capacity)
+        pre_roll.write(data)
+
+    def __finish(self):
+
+        self.__truncated = self.__capture.full
+        utterance, self.__capture = self.__capture.finish(), None
+        return utterance
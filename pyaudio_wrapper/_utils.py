@@ -1,9 +1,12 @@
-__all__ = ["_abstractmethod", "_abstract_property", "_under_audio_context"]
+__all__ = ["_abstractmethod", "_abstract_property", "_under_audio_context",
+           "_make_wav_header", "_LRUCache"]
 __doc__ = """Utilities Module. All helper functions are defined here.
 """
 
 from abc import abstractmethod
+from collections import OrderedDict
 from functools import wraps
+import struct
 
 def _abstractmethod(fun):
     """
@@ -56,4 +59,91 @@ def _under_audio_context(method):
             raise RuntimeError("Working outside of source context")
         return method(self, *args, **kwargs)
 
-    return wrapped
\ No newline at end of file
+    return wrapped
+
+def _make_wav_header(num_bytes, sample_rate, bit_width, channels):
+    """
+    Build the canonical 44 bytes RIFF header of a PCM wav file.
+
+    params:
+        `num_bytes`: size of the frames in bytes.
+        `sample_rate`: sample rate.
+        `bit_width`: bit width in bytes.
+        `channels`: number of channels.
+    """
+
+    block_align = bit_width * channels
+    return struct.pack("<4sI4s4sIHHIIHH4sI",
+                       b"RIFF", 36 + num_bytes, b"WAVE",
+                       b"fmt ", 16, 1, channels, sample_rate,
+                       sample_rate * block_align, block_align, 8 * bit_width,
+                       b"data", num_bytes)
+
+def _get_nbytes(value):
+    """
+    Estimate the memory used by `value`: the total size of the numpy arrays
+    it contains, possibly nested in tuples and lists.
+    """
+
+    if isinstance(value, (tuple, list)):
+        return sum(_get_nbytes(item) for item in value)
+    return getattr(value, "nbytes", 0)
+
+class _LRUCache(object):
+    """
+    A least recently used cache bounded by the memory used by its values.
+    """
+
+    def __init__(self, max_bytes):
+
+        self.__max_bytes = max_bytes
+        self.__nbytes = 0
+        self.__items = OrderedDict()
+
+    @property
+    def max_bytes(self):
+        return self.__max_bytes
+
+    @property
+    def nbytes(self):
+        return self.__nbytes
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __contains__(self, key):
+        return key in self.__items
+
+    def get(self, key, default = None):
+        """
+        Return the value of `key` and mark it as the most recently used.
+        """
+
+        if key not in self.__items:
+            return default
+        value, nbytes = self.__items.pop(key)
+        self.__items[key] = (value, nbytes)
+        return value
+
+    def put(self, key, value):
+        """
+        Cache `value`, evicting the least recently used values if needed.
+        A value larger than `max_bytes` is not cached at all.
+        """
+
+        if key in self.__items:
+            self.__nbytes -= self.__items.pop(key)[1]
+
+        nbytes = _get_nbytes(value)
+        if nbytes > self.__max_bytes:
+            return
+        while self.__items and self.__nbytes + nbytes > self.__max_bytes:
+            _, (_, evicted_nbytes) = self.__items.popitem(last = False)
+            self.__nbytes -= evicted_nbytes
+        self.__items[key] = (value, nbytes)
+        self.__nbytes += nbytes
+
+    def clear(self):
+
+        self.__items.clear()
+        self.__nbytes = 0
@@ -6,22 +6,30 @@ from collections import defaultdict as _defaultdict
 import matplotlib.pyplot as _plt
 from matplotlib.widgets import SpanSelector as _SpanSelector
 import numpy as _np
-import scipy.fftpack as _fftpack
+import scipy.fft as _scipy_fft
 import scipy.signal as _sg
 
 from .audio_data import AudioData as _AudioData
+from ._utils import _LRUCache
+from ._envelope import MinMaxPyramid as _MinMaxPyramid
+from . import dsp as _dsp
 
 class AudioAnalysor(object):
 
     __doc__ = "Audio Analysor: object to analyse the audio data such as plot, fft,...etc."
 
-    def __init__(self, audio_data):
+    def __init__(self, audio_data, max_cache_bytes = 256 * 1024**2):
+        """
+        params:
+            `audio_data`: the audio data to be analysed.
+            `max_cache_bytes`: memory limit of the cached transforms in bytes.
+        """
 
         # __current_widgets is here to keep the reference to active widgets
         # This will prevent those widgets to be garbage collected.
         self.__current_widgets = _defaultdict(lambda: [])
         self.__current_figs = []
-        self.__cached_fft = None
+        self.__cache = _LRUCache(max_cache_bytes)
 
         # Setup the audio data to be analysed.
         self.set_audio_data(audio_data)
@@ -48,17 +56,51 @@ class AudioAnalysor(object):
 
         self.__current_widgets = _defaultdict(lambda: [])
         self.__current_figs = []
-        self.__cached_fft = None
+        self.clear_cache()
 
+    def clear_cache(self):
+        """
+        Drop all cached transforms.
+        """
+        self.__cache.clear()
 
-    def fft(self, normalize = False):
+    def __cached(self, key, compute):
+        """
+        Return the cached value of `key`, computing it by `compute()` if missing.
+        Cached arrays are made read-only since they are shared between calls.
+        """
+
+        value = self.__cache.get(key)
+        if value is None:
+            value = compute()
+            for array in value:
+                array.flags.writeable = False
+            self.__cache.put(key, value)
+        return value
+
+    def fft(self, normalize = False, channel = None, start = None, stop = None, n_fft = None, workers = None):
         """
         params:
             `normalize`: if True, the data will be normalize before pass to fft. Default is False.
+            `channel`: index of the channel to transform. Default is all channels.
+            `start`, `stop`: the segment to transform in millisecond. Default is the whole audio.
+            `n_fft`: length of the transform. Default is the smallest fast length
+                     (`scipy.fft.next_fast_len`) not less than the segment. The
+                     segment is zero-padded to this length.
+            `workers`: number of threads used by `scipy.fft`. Default is one.
+
+        return:
+            A list of the coefficients of the non-negative frequencies (n_fft//2 + 1
+            of them), one per channel. The results are cached by the parameters.
         """
-        
-        coefs = []
-        data = self.audio_data.data
+
+        key = ("fft", normalize, channel, start, stop, n_fft)
+        return self.__cached(key, lambda: self.__fft(normalize, channel, start, stop, n_fft, workers))
+
+    def __fft(self, normalize, channel, start, stop, n_fft, workers):
+
+        audio_data = self.audio_data if start is None and stop is None else self.audio_data[start:stop]
+        data = audio_data.data
 
         if normalize:
             if self.audio_data.dtype in [_np.uint8, _np.uint16, _np.uint32]:
@@ -66,27 +108,83 @@ class AudioAnalysor(object):
             elif self.audio_data.dtype in [_np.int8, _np.int16, _np.int32]:
                 data = 2.*data/2**(4*self.audio_data.BIT_WIDTH) - 1
             else:
-                print "[Warning] Unrecognized dtype detected."
+                print("[Warning] Unrecognized dtype detected.")
+
+        data = data.reshape((audio_data.CHANNELS, -1))
+        if channel is not None:
+            data = data[channel:channel + 1]
+        # The channels of stereo data are interleaved. A contiguous copy is
+        # much faster to transform than the strided view.
+        data = _np.ascontiguousarray(data, dtype = _np.float64)
+        if n_fft is None:
+            n_fft = _scipy_fft.next_fast_len(max(data.shape[-1], 1), real = True)
+
+        # Since the data is real-valued, the real fft computes only the coefs for
+        # the non-negative freq. All channels are transformed in one call.
+        coefs = _scipy_fft.rfft(data, n = n_fft, axis = -1, workers = workers)
+        return list(coefs)
+
+    def stft(self, frame_ms = 25, hop_ms = 10, window = "hann", workers = None):
+        """
+        Short-time Fourier transform.
+
+        params:
+            `frame_ms`: frame size in millisecond.
+            `hop_ms`: hop size in millisecond.
+            `window`: any window supported by `scipy.signal.get_window`.
+            `workers`: number of threads used by `scipy.fft`. Default is one.
+
+        return:
+            (magnitude, phase): two arrays of shape (channels, frames, bins).
+            Each frame is zero-padded to a power of two before the transform.
+            The results are cached by the parameters.
+        """
 
-        if self.audio_data.CHANNELS == 1: # mono audio data
-            # Take only the coef for the positive freq since the data is real-valued.
-            N = len(self.audio_data.data)
-            c1 = _fftpack.fft(data)[:N/2]
-            coefs.append(c1)
-        else: # stereo audio data
-            N = len(self.audio_data.data[0])
-            c1 = _fftpack.fft(data[0])[:N/2]
-            coefs.append(c1)
-            c2 = _fftpack.fft(data[1])[:N/2]
-            coefs.append(c2)
-        self.__cached_fft = coefs
+        key = ("stft", frame_ms, hop_ms, window)
+        return self.__cached(key, lambda: self.__stft(frame_ms, hop_ms, window, workers))
 
-        return coefs
+    def __stft(self, frame_ms, hop_ms, window, workers):
 
-    def plot_spectrum(self, colors = None):
+        sample_rate = self.audio_data.SAMPLE_RATE
+        frame_length = max(1, int(round(frame_ms * sample_rate / 1000.)))
+        hop_length = max(1, int(round(hop_ms * sample_rate / 1000.)))
+
+        spectrum = _dsp.stft(self.audio_data.data, frame_length, hop_length, window, workers = workers)
+        spectrum = spectrum.reshape((self.audio_data.CHANNELS,) + spectrum.shape[-2:])
+        return (_np.abs(spectrum), _np.angle(spectrum))
+
+    def plot_spectrogram(self, frame_ms = 25, hop_ms = 10, window = "hann", cmap = "magma"):
+        """
+        Plot the spectrogram of each channel in decibel.
+
+        params:
+            `frame_ms`, `hop_ms`, `window`: see `stft`.
+            `cmap`: any colormap supported by matplotlib.
+        """
+
+        magnitude, _ = self.stft(frame_ms, hop_ms, window)
+        duration = self.audio_data.duration / 1000.
+        nyquist = self.audio_data.SAMPLE_RATE / 2.
+
+        fig, axs = _plt.subplots(self.audio_data.CHANNELS, 1, figsize = (20, 7), squeeze = False)
+        fig.suptitle(repr(self.audio_data), fontsize = 14, y = 1)
+
+        for i, ax in enumerate(axs[:, 0]):
+            decibel = 20 * _np.log10(magnitude[i].T + 1e-10)
+            ax.imshow(decibel, origin = "lower", aspect = "auto", cmap = cmap,
+                      extent = (0, duration, 0, nyquist))
+            ax.title.set_text("Channel {}".format(i+1))
+            ax.xaxis.set_label_text("Time (Seconds)")
+            ax.yaxis.set_label_text("Frequency (Hz)")
+
+        fig.subplots_adjust(top = 0.9, hspace = 0.3)
+        self.__current_figs.append(fig)
+
+    def plot_spectrum(self, colors = None, normalize = False):
         """
         params:
             `colors`: any interable of symbols of color `supported` by matplotlib
+            `normalize`: see `fft`.
         """
 
         if colors is None:
@@ -94,27 +192,22 @@ class AudioAnalysor(object):
         else:
             colors = _cycle(colors)
 
-        N = len(self.audio_data.data) if self.audio_data.CHANNELS == 1 else len(self.audio_data.data[0])
-
-        if self.__cached_fft is None:
-            self.fft()
-
-        coefs = self.__cached_fft
+        coefs = self.fft(normalize = normalize)
 
         fig, axs = _plt.subplots(len(coefs) + 1, 1, figsize = (20, 7))
         zoom_ax = axs[-1]
-        zoom_ax.set_axis_bgcolor("#E6E6B8")
+        zoom_ax.set_facecolor("#E6E6B8")
         zoom_ax.title.set_text("Selected Segment")
         zoom_line, = zoom_ax.plot([], [], "#008A2E")
 
         for i in range(len(coefs)):
             coef = coefs[i]
-            y = _np.abs(coef[1:N/2])
+            y = _np.abs(coef[1:])
             x = _np.arange(len(y))
-            color = colors.next()
+            color = next(colors)
             ax = axs[i]
 
-            ax.set_axis_bgcolor("#E6E6B8")
+            ax.set_facecolor("#E6E6B8")
             ax.title.set_text("Channel {}".format(i+1))
             ax.plot(x, y, color)
 
@@ -132,15 +225,15 @@ class AudioAnalysor(object):
                 
                 _plt.draw()
 
-            span_selector = _SpanSelector(ax, onselect_callback, 'horizontal', span_stays = True, 
-                                          rectprops = dict(alpha = 0.5, facecolor = 'cyan'))
+            span_selector = _SpanSelector(ax, onselect_callback, 'horizontal', interactive = True,
+                                          props = dict(alpha = 0.5, facecolor = 'cyan'))
             self.__current_widgets["span_selectors"].append(span_selector)
 
         self.__current_figs.append(fig)
         fig.subplots_adjust(top = 0.9, hspace = 0.3)
 
 
-    def plot(self, by_sec = True, colors = None):
+    def plot(self, by_sec = True, colors = None, num_buckets = 2000):
         """
         Plot the audio data.
 
@@ -148,6 +241,9 @@ class AudioAnalysor(object):
             `by_sec`: if True, it will plot the audio in second or it will plot
                       the audio data in the number of frames.
             `colors`: Any iterable of symbols of color supported by matplotlib.
+            `num_buckets`: number of min/max buckets drawn for the visible range.
+                           Long audio data is decimated so that the drawing
+                           time does not depend on its length.
         """
         if colors is None:
             colors = _cycle(["#FF6600", "#0033CC"])
@@ -158,63 +254,95 @@ class AudioAnalysor(object):
         fig, axs = _plt.subplots(num_subplots, 1, figsize = (20, 7))
         fig.suptitle(repr(self.audio_data), fontsize = 14, y = 1)
         frames = [self.audio_data.data[i] for i in range(2)] if self.audio_data.CHANNELS == 2 else [self.audio_data.data]
+        pyramids = [_MinMaxPyramid(frame) for frame in frames]
+        num_frames = self.audio_data.num_frames
 
+        # scale from frame index to x coordinate.
         if by_sec:
-            x = _np.linspace(0, len(frames[0])/self.audio_data.SAMPLE_RATE, num = len(frames[0]))
+            scale = 1. / self.audio_data.SAMPLE_RATE
             x_label = "Time (Seconds)"
         else:
-            x = _np.linspace(0, len(frames[0]), num = len(frames[0]))
+            scale = 1.
             x_label = "Frame"
 
+        def redraw(line, pyramid, xmin, xmax):
+            """
+            Decimate the frames between `xmin` and `xmax` from the pyramid.
+            """
+            indmin = max(0, int(_np.floor(xmin / scale)))
+            indmax = min(num_frames, int(_np.ceil(xmax / scale)) + 1)
+            index, values = pyramid.envelope(indmin, indmax, num_buckets)
+            line.set_data(index * scale, values)
+            return indmin, indmax, values
+
         zoom_ax = axs[-1]
-        zoom_ax.set_axis_bgcolor("#E6E6B8")
+        zoom_ax.set_facecolor("#E6E6B8")
         zoom_ax.title.set_text("Selected Segment")
         zoom_ax.xaxis.set_label_text(x_label)
         zoom_ax.yaxis.set_label_text("Altitude")
         zoom_line, = zoom_ax.plot([], [], "#008A2E")
+        zoom_state = {"pyramid": pyramids[0]}
+
+        def on_zoom_xlim_changed(ax):
+            xmin, xmax = ax.get_xlim()
+            redraw(zoom_line, zoom_state["pyramid"], xmin, xmax)
 
-        temp = []
-        for i, (ax, frame) in enumerate(zip(axs[:-1], frames)):
-            color = colors.next()
+        zoom_ax.callbacks.connect("xlim_changed", on_zoom_xlim_changed)
+
+        for i, (ax, pyramid) in enumerate(zip(axs[:-1], pyramids)):
+            color = next(colors)
 
             ax.title.set_text("Channel {}".format(i+1))
-            ax.set_axis_bgcolor("#E6E6B8")
-            ax.plot(x, frame, color)
-            ax.set_xlim(x[0], x[-1])
+            ax.set_facecolor("#E6E6B8")
+            line, = ax.plot([], [], color)
+            redraw(line, pyramid, 0, num_frames * scale)
+            ax.set_xlim(0, max(num_frames - 1, 1) * scale)
+            ax.set_ylim(*self.__get_ylim(pyramid.envelope(0, num_frames, 1)[1]))
             ax.xaxis.set_label_text(x_label)
             ax.yaxis.set_label_text("Altitude")
 
-            def onselect_callback(xmin, xmax):
+            # Zooming in with the toolbar re-decimates the visible range.
+            ax.callbacks.connect("xlim_changed",
+                                 lambda ax, line = line, pyramid = pyramid: redraw(line, pyramid, *ax.get_xlim()))
 
-                indmin, indmax = _np.searchsorted(x, (xmin, xmax))
-                indmax = min(len(frames[0]) - 1, indmax)
+            def onselect_callback(xmin, xmax, pyramid = pyramid):
 
-                x_segment = x[indmin:indmax]
-                y_segment = frame[indmin:indmax]
-                zoom_line.set_data(x_segment, y_segment)
-                zoom_ax.set_xlim(x_segment[0], x_segment[-1])
-                zoom_ax.set_ylim(y_segment.min(), y_segment.max())
+                zoom_state["pyramid"] = pyramid
+                indmin, indmax, values = redraw(zoom_line, pyramid, xmin, xmax)
+                if len(values) == 0:
+                    return
+                zoom_ax.set_xlim(indmin * scale, (indmax - 1) * scale)
+                zoom_ax.set_ylim(*self.__get_ylim(values))
 
                 if by_sec:
-                    x_start = int(self.audio_data.duration * float(indmin) / len(x))
-                    x_stop = int(self.audio_data.duration * float(indmax) / len(x))
+                    x_start = int(1000. * indmin / self.audio_data.SAMPLE_RATE)
+                    x_stop = int(1000. * indmax / self.audio_data.SAMPLE_RATE)
                 else:
                     x_start = indmin
                     x_stop = indmax
                 
-                start_time = self.audio_data.duration * float(indmin) / len(x)
-                stop_time = self.audio_data.duration * float(indmax) / len(x)
+                start_time = 1000. * indmin / self.audio_data.SAMPLE_RATE
+                stop_time = 1000. * indmax / self.audio_data.SAMPLE_RATE
                 zoom_ax.title.set_text("Selected Segment: {} to {}".format(x_start, x_stop))
                 _plt.draw()
 
-                self.audio_data.play(start_time, stop_time)
+                # Selecting again stops the segment being played.
+                self.audio_data.play(start_time, stop_time, block = False)
             
-            span_selector = _SpanSelector(ax, onselect_callback, 'horizontal', span_stays = True, 
-                                          rectprops = dict(alpha = 0.5, facecolor = 'cyan'))
+            span_selector = _SpanSelector(ax, onselect_callback, 'horizontal', interactive = True,
+                                          props = dict(alpha = 0.5, facecolor = 'cyan'))
             self.__current_widgets["span_selectors"].append(span_selector)
         fig.subplots_adjust(top = 0.9, hspace = 0.7)
         self.__current_figs.append(fig)
 
+    @staticmethod
+    def __get_ylim(values):
+
+        ymin, ymax = float(values.min()), float(values.max())
+        if ymin == ymax:
+            ymin, ymax = ymin - 1, ymax + 1
+        return ymin, ymax
+
     def show(self):
         """
         Show the plots.
@@ -231,25 +359,63 @@ class AudioAnalysor(object):
 
     def denoise(self, method = 'energy', **kwargs):
         """
-        Denoise the audio data.
+        Denoise the audio data. The denoised audio data becomes the current
+        audio data to be analysed.
 
         `params`:
-            `method` <string>: available values --> 'energy', .
+            `method` <string>: available values --> 'energy', 'freq'.
+            `kwargs`: parameters of the method.
+                'energy': gate the frames with low energy.
+                    `threshold`: rms threshold. Default is twice the estimated noise floor.
+                    `frame_ms`: frame size in millisecond. Default is 20.
+                    `attenuation`: gain of the gated frames. Default is 0.
+                    `fade_ms`: crossfade length in millisecond. Default is 5.
+                'freq': spectral subtraction.
+                    `noise`: the noise power spectrum (see `dsp.noise_profile`) or
+                             an AudioData of noise only. Default is estimated from
+                             the quietest frames.
+                    `frame_ms`: frame size in millisecond. Default is 32.
+                    `hop_ms`: hop size in millisecond. Default is a quarter of `frame_ms`.
+                    `over_subtraction`: multiplier of the noise spectrum. Default is 2.
+                    `floor`: minimum gain. Default is 0.05.
 
         `return`:
             audio_data_denoised <AudioData>: An AudioData instance of denoised audio.
         """
         
         if method == 'energy':
-            self.set_audio_data(self.__denoise_by_energy(**kwargs))
+            audio_data_denoised = self.__denoise_by_energy(**kwargs)
         elif method == 'freq':
-            self.set_audio_data(self.__denoise_by_freq(**kwargs))
+            audio_data_denoised = self.__denoise_by_freq(**kwargs)
         else:
-            pass
+            raise ValueError("Unknown denoising method: {}".format(method))
+
+        self.set_audio_data(audio_data_denoised)
+        return audio_data_denoised
+
+    def __denoise_by_energy(self, threshold = None, frame_ms = 20, attenuation = 0., fade_ms = 5):
+
+        sample_rate = self.audio_data.SAMPLE_RATE
+        frame_length = max(1, int(round(frame_ms * sample_rate / 1000.)))
+        fade_length = int(round(fade_ms * sample_rate / 1000.))
+
+        gated = _dsp.energy_gate(self.audio_data.data, frame_length, threshold, attenuation, fade_length)
+        return self.audio_data._spawn(gated.tobytes())
+
+    def __denoise_by_freq(self, noise = None, frame_ms = 32, hop_ms = None,
+                          over_subtraction = 2., floor = 0.05, workers = None):
+
+        sample_rate = self.audio_data.SAMPLE_RATE
+        frame_length = max(1, int(round(frame_ms * sample_rate / 1000.)))
+        hop_length = None if hop_ms is None else max(1, int(round(hop_ms * sample_rate / 1000.)))
 
-    def __denoise_by_energy(self, threshold = None):
-        pass
+        if isinstance(noise, _AudioData):
+            if noise.SAMPLE_RATE != sample_rate:
+                raise ValueError("The sample rate of `noise` should be {}.".format(sample_rate))
+            noise = _dsp.noise_profile(noise.data, frame_length, hop_length, percentile = 100)
 
-    def __denoise_by_freq(self, threshold = None):
-        pass
+        denoised = _dsp.spectral_subtract(self.audio_data.data, frame_length, hop_length, noise,
+                                          over_subtraction = over_subtraction, floor = floor,
+                                          workers = workers)
+        return self.audio_data._spawn(denoised.tobytes())
 
@@ -1,11 +1,15 @@
-__all__ = ["AudioData", "WavAudioData", "WavFileAudioData"]
+__all__ = ["AudioData", "WavAudioData", "WavFileAudioData", "WavWriter"]
 
-import io, wave, os, audioop, sys
+import io, wave, os, sys
 import numpy as np
 from scipy.io import wavfile
 import pyaudio
 
 from ._audio_data_abc import AudioDataABC
+from ._utils import _make_wav_header
+from .resample import resample
+from .playback import get_engine
+from . import dsp
 
 if sys.version_info > (3,):
     long = int
@@ -14,7 +18,8 @@ class AudioData(AudioDataABC):
 
     def __init__(self, byte_data, sample_rate, bit_width, channels, dtype = None):
         """
-        byte_data: A byte string containing the raw data.
+        byte_data: A byte string containing the raw data. It can also be a list
+                   of byte strings which will be concatenated lazily.
         BIT_WIDTH: bit width in bytes.
         """
         
@@ -32,7 +37,10 @@ class AudioData(AudioDataABC):
         self.__bit_width = bit_width
         self.__channels = channels
         self.__sample_rate = sample_rate
-        self.__byte_data = byte_data # a byte string
+        # list of byte strings, joined on the first access of `BYTE_DATA`.
+        self.__segments = list(byte_data) if isinstance(byte_data, (list, tuple)) else [byte_data]
+        self.__num_bytes = sum(memoryview(segment).nbytes for segment in self.__segments)
+        self.__data = None # cached numpy array of `byte_data`
 
         if dtype is None:
             dtype = self._get_dtype_by_bit_width()
@@ -110,8 +118,14 @@ class AudioData(AudioDataABC):
     def BYTE_DATA(self):
         """
         raw byte data of frames.
+
+        It is a bytes-like object. For audio data sliced from another one,
+        it is a `memoryview` sharing the buffer of its parent.
         """
-        return self.__byte_data
+        if len(self.__segments) != 1:
+            # Audio data built by concatenation. Join the segments only once.
+            self.__segments = [b''.join(self.__segments)]
+        return self.__segments[0]
 
     @BYTE_DATA.setter
     def BYTE_DATA(self):
@@ -121,79 +135,112 @@ class AudioData(AudioDataABC):
     def data(self):
         """
         Numeric presentation of the raw data.
+
+        The array is decoded from `BYTE_DATA` on first access and cached
+        afterward. It is a read-only view sharing memory with `BYTE_DATA`.
         """
-        if self.BIT_WIDTH == 1:
-            data_array = np.fromstring(self.BYTE_DATA, dtype = self.dtype)
-        elif self.BIT_WIDTH == 2:
-            data_array = np.fromstring(self.BYTE_DATA, dtype = self.dtype)
-        elif self.BIT_WIDTH == 4:
-            data_array = np.fromstring(self.BYTE_DATA, dtype = self.dtype)
-        elif self.BIT_WIDTH == 3:
+        if self.__data is None:
             # Since numpy does not have 3 bytes data type, 
             # using np.int32 instead. Be caution with 24-bits audio data.
-            data_array = np.fromstring(self.BYTE_DATA, dtype = self.dtype)
-        if self.CHANNELS == 1:
-            return data_array.T
-        elif self.CHANNELS == 2:
-            return data_array.reshape((len(data_array)/2, 2)).T
-        else:
-            return None
+            data_array = np.frombuffer(self.BYTE_DATA, dtype = self.dtype)
+            if self.CHANNELS == 2:
+                data_array = data_array.reshape((-1, 2)).T
+            data_array.flags.writeable = False
+            self.__data = data_array
+        return self.__data
 
     @data.setter
     def data(self, value):
         raise RuntimeError("It is not allowed to modify this attribute.")
 
+    @property
+    def num_bytes(self):
+        """
+        Size of the raw byte data in bytes.
+        """
+        return self.__num_bytes
+
+    @property
+    def num_frames(self):
+        """
+        Number of frames.
+
+        It is computed from the size of the raw byte data so no sample
+        will be decoded.
+        """
+        return self.num_bytes // (self.BIT_WIDTH * self.CHANNELS)
+
     @property
     def duration(self):
         """
         Duration in millisecond.
         """
         
-        return int(round(len(self)*1000/float(self.SAMPLE_RATE)))
+        return int(round(self.num_frames*1000/float(self.SAMPLE_RATE)))
 
-    def play(self, start = 0, stop = None):
+    def play(self, start = 0, stop = None, block = True, queue = False):
         """
         params:
           `start`: start time in millisecond.
           `stop`: stop time in millisecond
+          `block`: if True, return once the audio has been played.
+          `queue`: if True, play after the audio data already playing.
+                   Otherwise the audio data playing is stopped.
+
+        return:
+          A PlaybackHandle, with which the playback can be stopped or waited for.
         """
         
         assert isinstance(start, (float, int)) and start >= 0, "`start` must be non-negative number."
         assert isinstance(stop, (float, int)) and stop > start or stop is None, "`stop` can be either non-negative number or None. If it is a number, it must be larger than `start`."
 
-        audio = pyaudio.PyAudio()
-        output_device_info = audio.get_default_output_device_info()
-        output_stream = audio.open(
-                        output_device_index = output_device_info["index"],
-                        output = True,
-                        format = self.format,
-                        rate = self.SAMPLE_RATE,
-                        channels = self.CHANNELS)
-        if start == 0 and stop is None:
-            output_stream.write(self.BYTE_DATA)
-        else:
-            start_index = int(round(self.SAMPLE_RATE * start / 1000.))
-            if stop is not None:
-                stop_index = int(round(self.SAMPLE_RATE * stop / 1000.))
-            else:
-                stop_index = stop
-
-            data = self.data[start_index:stop_index] if self.CHANNELS == 1 else self.data[:, start_index:stop_index].T
-            output_stream.write(data.tostring())
-
-        output_stream.stop_stream()
-        output_stream.close()
-        audio.terminate()
-
-    def convert_sample_rate(self, out_rate):
-        new_byte_data, _ = audioop.ratecv(self.BYTE_DATA,
-                                       self.BIT_WIDTH,
-                                       self.CHANNELS,
-                                       self.SAMPLE_RATE,
-                                       out_rate,
-                                       None)
-        self.__sample_rate = out_rate
-        self.__byte_data = new_byte_data
+        # Play the bytes of the selected frames straight from BYTE_DATA.
+        start_index = int(round(self.SAMPLE_RATE * start / 1000.))
+        stop_index = self.num_frames if stop is None else int(round(self.SAMPLE_RATE * stop / 1000.))
+        frame_width = self.BIT_WIDTH * self.CHANNELS
+        byte_data = memoryview(self.BYTE_DATA)[start_index * frame_width:stop_index * frame_width]
+
+        engine = get_engine(self.SAMPLE_RATE, self.BIT_WIDTH, self.CHANNELS, self.format)
+        handle = engine.play(byte_data, queue = queue)
+        if block:
+            try:
+                handle.wait()
+            except KeyboardInterrupt:
+                handle.stop()
+                raise
+        return handle
+
+    def convert_sample_rate(self, out_rate, method = "poly"):
+        """
+        Return a new audio data resampled to `out_rate`.
+
+        params:
+            `out_rate`: the new sample rate.
+            `method`: 'poly' for polyphase filtering or 'sinc' for windowed-sinc
+                      interpolation. See `pyaudio_wrapper.resample.resample`.
+        """
+
+        resampled = resample(self.data, self.SAMPLE_RATE, out_rate, method = method)
+        return self._spawn(self._encode(resampled), sample_rate = out_rate)
+
+    def iter_chunks(self, frames_per_chunk):
+        """
+        Iterate over the audio data chunk by chunk.
+
+        params:
+            `frames_per_chunk`: number of frames per chunk. The last chunk
+                                may be shorter.
+
+        Each chunk is a view sharing the buffer of this audio data. With
+        `WavFileAudioData(fname, use_mmap = True)`, a file of any length can
+        thus be processed in constant memory.
+        """
+
+        assert isinstance(frames_per_chunk, (int, long)) and frames_per_chunk > 0, \
+                "`frames_per_chunk` must be positive integer."
+
+        for start in range(0, self.num_frames, frames_per_chunk):
+            yield self._frame_slice(start, start + frames_per_chunk)
 
     def __getitem__(self, i):
 
@@ -206,29 +253,56 @@ class AudioData(AudioDataABC):
         assert step is None or round(step) == step, "The step index must be integer or integer like (in millisecond)."
 
 
-        start_index = round(start/1000. * self.SAMPLE_RATE) if start is not None else start
-        stop_index = round(stop/1000. * self.SAMPLE_RATE) if stop is not None else stop
+        start_index = int(round(start/1000. * self.SAMPLE_RATE)) if start is not None else start
+        stop_index = int(round(stop/1000. * self.SAMPLE_RATE)) if stop is not None else stop
 
         s = slice(start_index, stop_index, step)
 
+        if step is None or step == 1:
+            start_index, stop_index, _ = s.indices(self.num_frames)
+            return self._frame_slice(start_index, stop_index)
+
+        # Frames are not contiguous. Fall back to copying.
         if self.CHANNELS == 1:
             data = self.data[s].T
         elif self.CHANNELS == 2:
             data = self.data[:, s].T
 
-        return type(self)(data.tostring(), 
-                          self.SAMPLE_RATE,
-                          self.BIT_WIDTH, 
-                          self.CHANNELS,
-                          self.dtype)
+        return self._spawn(data.tobytes())
+
+    def _frame_slice(self, start, stop):
+        """
+        Return the audio data of frames from `start` to `stop` (exclusive).
+
+        No data is copied. The returned audio data is a view sharing the
+        buffer of this one.
+        """
+
+        frame_width = self.BIT_WIDTH * self.CHANNELS
+        stop = max(start, stop)
+        view = memoryview(self.BYTE_DATA)[start*frame_width:stop*frame_width]
+        return self._spawn(view)
+
+    def _spawn(self, byte_data, sample_rate = None):
+        """
+        Create a new audio data of the same format with given `byte_data`.
+        """
+
+        if sample_rate is None:
+            sample_rate = self.SAMPLE_RATE
+        return type(self)(byte_data, sample_rate, self.BIT_WIDTH, self.CHANNELS, self.dtype)
+
+    def _encode(self, array):
+        """
+        Convert an array shaped like `data` into raw byte data of this format.
+
+        Values are rounded and saturated to the range of `dtype`.
+        """
+
+        return dsp.saturate(array, self.dtype).T.tobytes()
 
     def __len__(self):
-        if self.CHANNELS == 1:
-            return len(self.data)
-        elif self.CHANNELS == 2:
-            return len(self.data[0])
-        else:
-            return None
+        return self.num_frames
 
     def __repr__(self):
         samprate = self.SAMPLE_RATE
@@ -237,13 +311,10 @@ class AudioData(AudioDataABC):
         return "WAV Audio: %s, %s, %s" % (samprate, bit_width, channels)
 
     def __str__(self):
-        dest_string = "data: {}\nbit width: {}\nsample rate: {}\nnumber of frames: {}\n"
-        return dest_string.format(repr(self.data), self.BIT_WIDTH, self.SAMPLE_RATE, len(self))
+        dest_string = "bit width: {}\nsample rate: {}\nchannels: {}\nnumber of frames: {}\nduration: {} ms\n"
+        return dest_string.format(self.BIT_WIDTH, self.SAMPLE_RATE, self.CHANNELS, self.num_frames, self.duration)
 
-    def __add__(self, other):
-        """
-        Concatenate two audio data.
-        """
+    def _check_concatenable(self, other):
 
         if not isinstance(other, AudioData):
             raise ValueError("Can concatenate with object of type {} only.".format(AudioData))
@@ -251,9 +322,50 @@ class AudioData(AudioDataABC):
             raise ValueError("Both audio data should have the same bit width.")
         if not self.SAMPLE_RATE == other.SAMPLE_RATE:
             raise ValueError("Both audio data should have the same sample rate.")
+        if not self.CHANNELS == other.CHANNELS:
+            raise ValueError("Both audio data should have the same number of channels.")
+
+    def __add__(self, other):
+        """
+        Concatenate two audio data.
+
+        No data is copied until `BYTE_DATA` of the result is accessed, so
+        chaining `a + b + c + ...` takes linear time.
+        """
+
+        self._check_concatenable(other)
+        return self._spawn(self.__segments + other.__segments)
+
+    @classmethod
+    def concat(cls, audio_datas):
+        """
+        Concatenate audio data in linear time.
+
+        params:
+            `audio_datas`: an iterable of audio data of type `cls`.
+                           All of them must have the same format.
+
+        return:
+            The concatenated audio data. It is of the same type as the
+            result of `audio_datas[0] + audio_datas[1]`.
+        """
+
+        audio_datas = iter(audio_datas)
+        try:
+            first = next(audio_datas)
+        except StopIteration:
+            raise ValueError("Nothing to concatenate.")
+        if not isinstance(first, cls):
+            raise ValueError("Can concatenate with object of type {} only.".format(cls))
 
-        new_byte_data = b''.join([self.BYTE_DATA, other.BYTE_DATA])
-        return type(self)(new_byte_data, self.SAMPLE_RATE, self.BIT_WIDTH, self.CHANNELS, self.dtype)
+        segments = list(first.__segments)
+        for audio_data in audio_datas:
+            if not isinstance(audio_data, cls):
+                raise ValueError("Can concatenate with object of type {} only.".format(cls))
+            first._check_concatenable(audio_data)
+            segments.extend(audio_data.__segments)
+
+        return first._spawn(segments)
 
 
     def __mul__(self, factor):
@@ -263,8 +375,7 @@ class AudioData(AudioDataABC):
 
         if not isinstance(factor, (int, float)):
             return NotImplemented # passing the job to factor.__rmul__
-        new_byte_data = audioop.mul(self.BYTE_DATA, self.BIT_WIDTH, factor)
-        return type(self)(new_byte_data, self.SAMPLE_RATE, self.BIT_WIDTH, self.CHANNELS, self.dtype)
+        return self._spawn(self._encode(dsp.gain(self.data, factor)))
 
     def __rmul__(self, factor):
         """
@@ -279,37 +390,36 @@ class AudioData(AudioDataABC):
 
 class WavAudioData(AudioData):        
 
+    def __init__(self, byte_data, sample_rate, bit_width, channels, dtype = None):
+
+        super(WavAudioData, self).__init__(byte_data, sample_rate, bit_width, channels, dtype)
+        self.__wav_header = None
+
+    @property
+    def wav_header(self):
+        """
+        The 44 bytes RIFF header of the wav audio data.
+        """
+
+        if self.__wav_header is None:
+            self.__wav_header = _make_wav_header(self.num_bytes,
+                                                 self.SAMPLE_RATE,
+                                                 self.BIT_WIDTH,
+                                                 self.CHANNELS)
+        return self.__wav_header
+
     @property
     def raw_wav_data(self):
         """
         Raw WAV audio data.
         """
         
-        return self.__get_raw_wav_data_from_byte(self.BYTE_DATA)
+        return b''.join([self.wav_header, self.BYTE_DATA])
 
     @raw_wav_data.setter
     def raw_wav_data(self, value):
         raise RuntimeError("It is not allowed to modify this attribute.")
 
-    def __get_raw_wav_data_from_byte(self, byte_data):
-        """
-        Convert original byte data into wav formated byte data.
-        """
-
-        with io.BytesIO() as wav_file:
-            try:
-                wav_writer = wave.open(wav_file, "wb")
-                wav_writer.setframerate(self.SAMPLE_RATE)
-                wav_writer.setsampwidth(self.BIT_WIDTH)
-                wav_writer.setnchannels(self.CHANNELS)
-                wav_writer.writeframes(byte_data)
-            except ValueError as e:
-                raise e
-            finally:
-                wav_writer.close()
-            wav_data = wav_file.getvalue()
-        return wav_data
-
     def __get_raw_wav_data_from_array(self, array):
         """
         `array`: a 1-D or a 2-D numpy array.
@@ -342,15 +452,24 @@ class WavAudioData(AudioData):
 
         file_path = os.path.abspath(os.path.join(path, fname))
 
+        # Write the header and the frames directly without joining them.
         with open(file_path, "wb") as wav_file:
-            wav_file.write(self.raw_wav_data)
+            wav_file.writelines([self.wav_header, self.BYTE_DATA])
 
 class WavFileAudioData(WavAudioData):
 
-    def __init__(self, fname):
+    def __init__(self, fname, use_mmap = False):
+        """
+        params:
+            `fname`: path to the wav file.
+            `use_mmap`: if True, the wav file is memory-mapped instead of
+                        being read into memory. Pages are loaded by the OS
+                        on demand, which is suitable for files larger than
+                        the RAM. Default is False.
+        """
 
         fname = os.path.abspath(fname)
-        sample_rate, data = wavfile.read(fname)
+        sample_rate, data = wavfile.read(fname, mmap = use_mmap)
         if data.ndim == 2:
             channels = 2
         else:
@@ -363,8 +482,9 @@ class WavFileAudioData(WavAudioData):
         else:
             bit_width = 4
         
-        byte_data = data.tostring()
-        
+        # Share the memory of `data` (or the mapping) instead of copying it.
+        byte_data = memoryview(data.reshape(-1).view(np.uint8))
+
         super(WavFileAudioData, self).__init__(byte_data = byte_data, 
                                                sample_rate = sample_rate,
                                                bit_width = bit_width,
@@ -376,65 +496,85 @@ class WavFileAudioData(WavAudioData):
 
         return 'WAV File: %s' % self.fname
 
-    def __add__(self, other):
+    def _spawn(self, byte_data, sample_rate = None):
         """
-        Concatenate two audio data.
+        Audio data derived from a wav file is no longer backed by the file.
         """
 
-        if not isinstance(other, AudioData):
-            raise ValueError("Can concatenate with object of type {} only.".format(AudioData))
-        if not self.BIT_WIDTH == other.BIT_WIDTH:
-            raise ValueError("Both audio data should have the same bit width.")
-        if not self.SAMPLE_RATE == other.SAMPLE_RATE:
-            raise ValueError("Both audio data should have the same sample rate.")
+        if sample_rate is None:
+            sample_rate = self.SAMPLE_RATE
+        return WavAudioData(byte_data, sample_rate, self.BIT_WIDTH, self.CHANNELS, self.dtype)
 
-        new_byte_data = b''.join([self.BYTE_DATA, other.BYTE_DATA])
-        return WavAudioData(new_byte_data, self.SAMPLE_RATE, self.BIT_WIDTH, self.CHANNELS, self.dtype)
 
+class WavWriter(object):
+    """
+    Write audio data to a wav file incrementally.
 
-    def __mul__(self, factor):
+    The RIFF header is patched with the final sizes on `close`.
+
+    ex:
+        with WavWriter("out.wav", 44100, 2, 1) as writer:
+            for chunk in wav_audio.iter_chunks(4096):
+                writer.write(chunk)
+    """
+
+    def __init__(self, fname, sample_rate, bit_width, channels):
         """
-        Implement audio_data * factor
+        params:
+            `fname`: path to the wav file.
+            `sample_rate`, `bit_width`, `channels`: format of the audio data
+                                                    to be written.
         """
 
-        if not isinstance(factor, (int, float)):
-            return NotImplemented # passing the job to factor.__rmul__
-        new_byte_data = audioop.mul(self.BYTE_DATA, self.BIT_WIDTH, factor)
-        
-        return WavAudioData(new_byte_data, self.SAMPLE_RATE, self.BIT_WIDTH, self.CHANNELS, self.dtype)
+        assert fname.endswith("wav"), "The file extension must be wav."
+        assert channels in (1, 2), \
+                "`channels` can be either 1(mono) or 2(stereo) only."
 
-    def __rmul__(self, factor):
+        self.__fname = os.path.abspath(fname)
+        self.__sample_rate = sample_rate
+        self.__bit_width = bit_width
+        self.__channels = channels
+
+        self.__wav_writer = wave.open(self.__fname, "wb")
+        self.__wav_writer.setframerate(sample_rate)
+        self.__wav_writer.setsampwidth(bit_width)
+        self.__wav_writer.setnchannels(channels)
+
+    @property
+    def fname(self):
+        return self.__fname
+
+    @property
+    def closed(self):
+        return self.__wav_writer is None
+
+    def write(self, audio_data):
         """
-        Implement factor * audio_data
+        Append `audio_data` to the wav file.
         """
-        
-        if not isinstance(factor, (int, float)):
-            raise ValueError("Can only multiply audio data by number.")
-        
-        return self * factor
 
-    def __getitem__(self, i):
-        
-        start = i.start
-        step = i.step
-        stop = i.stop
+        if self.closed:
+            raise RuntimeError("Writing to a closed wav file.")
+        if not isinstance(audio_data, AudioData):
+            raise ValueError("Can write object of type {} only.".format(AudioData))
+        if not (audio_data.SAMPLE_RATE == self.__sample_rate and
+                audio_data.BIT_WIDTH == self.__bit_width and
+                audio_data.CHANNELS == self.__channels):
+            raise ValueError("The format of `audio_data` does not match the wav file.")
 
-        assert start is None or round(start) == start, "The start index must be integer or integer like (in millisecond)."
-        assert stop is None or round(stop) == stop, "The stop index must be integer or integer like (in millisecond)."
-        assert step is None or round(step) == step, "The step index must be integer or integer like (in millisecond)."
+        self.__wav_writer.writeframesraw(audio_data.BYTE_DATA)
 
-        start_index = round(start/1000. * self.SAMPLE_RATE) if start is not None else start
-        stop_index = round(stop/1000. * self.SAMPLE_RATE) if stop is not None else stop
+    def close(self):
+        """
+        Patch the header and close the wav file.
+        """
 
-        s = slice(start_index, stop_index, step)
+        if not self.closed:
+            self.__wav_writer.close()
+            self.__wav_writer = None
 
-        if self.CHANNELS == 1:
-            data = self.data[s].T
-        elif self.CHANNELS == 2:
-            data = self.data[:, s].T
+    def __enter__(self):
+        return self
 
-        return WavAudioData(data.tostring(), 
-                            self.SAMPLE_RATE,
-                            self.BIT_WIDTH, 
-                            self.CHANNELS,
-                            self.dtype)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
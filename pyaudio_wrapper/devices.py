@@ -0,0 +1,162 @@
+"""
+The `devices` submodule: a shared PortAudio context and a cached device table.
+
+Initialising PortAudio scans all host APIs, which can take hundreds of ms.
+Instead of creating a `pyaudio.PyAudio` instance for every operation, the
+classes of this package share one, reference-counted: it is created by the
+first `acquire_audio` and kept alive when it is released, so that playing or
+recording again does not initialise PortAudio again. It is terminated by
+`shutdown`, which is called at exit.
+
+The device table is read once and cached. Call `refresh_devices` after
+plugging or unplugging a device.
+
+ex:
+    with audio_context() as audio:
+        stream = audio.open(...)
+"""
+
+__all__ = ["acquire_audio", "release_audio", "audio_context", "shutdown", "refresh_devices",
+           "get_device_count", "get_device_info", "get_default_input_device_info",
+           "get_default_output_device_info"]
+
+from contextlib import contextmanager
+import atexit
+import threading
+
+import pyaudio
+
+_lock = threading.RLock()
+_audio = None
+_ref_count = 0
+_device_table = None
+
+def acquire_audio():
+    """
+    Return the shared `pyaudio.PyAudio` instance, initialising PortAudio if
+    needed. Every call must be paired with a call to `release_audio`.
+    """
+
+    global _audio, _ref_count
+    with _lock:
+        if _audio is None:
+            _audio = pyaudio.PyAudio()
+        _ref_count += 1
+        return _audio
+
+def release_audio():
+    """
+    Release the shared `pyaudio.PyAudio` instance. PortAudio stays
+    initialised for the next `acquire_audio` until `shutdown` is called.
+    """
+
+    global _ref_count
+    with _lock:
+        assert _ref_count > 0, "The audio context is not acquired."
+        _ref_count -= 1
+
+def shutdown():
+    """
+    Terminate PortAudio if the shared instance is not in use. It is
+    initialised again by the next `acquire_audio`.
+
+    return:
+        False if the instance is still acquired, so it was not terminated.
+    """
+
+    global _audio
+    with _lock:
+        if _ref_count > 0:
+            return False
+        if _audio is not None:
+            _audio.terminate()
+            _audio = None
+        return True
+
+@contextmanager
+def audio_context():
+    """
+    Context manager holding the shared `pyaudio.PyAudio` instance.
+    """
+
+    audio = acquire_audio()
+    try:
+        yield audio
+    finally:
+        release_audio()
+
+def refresh_devices():
+    """
+    Initialise PortAudio again and read the device table again.
+
+    PortAudio only sees the devices present when it was initialised, so it
+    can not be refreshed while a stream is open. The idle output streams of
+    the playback engines are closed first.
+
+    return:
+        The list of the info dicts of the devices.
+
+    Raise:
+        RuntimeError: if audio is being played, or a source is still open.
+                      Nothing is stopped in this case.
+    """
+
+    # Imported here since the playback module depends on this one.
+    from .playback import close_engines
+
+    close_engines(stop = False)
+    with _lock:
+        if not shutdown():
+            raise RuntimeError("The audio context is in use. Close all the sources before refreshing the devices.")
+        return _read_device_table()
+
+def _read_device_table():
+
+    global _device_table
+    with _lock:
+        with audio_context() as audio:
+            devices = [audio.get_device_info_by_index(index) for index in range(audio.get_device_count())]
+            defaults = {}
+            for kind, get_info in [("input", audio.get_default_input_device_info),
+                                   ("output", audio.get_default_output_device_info)]:
+                try:
+                    defaults[kind] = int(get_info()["index"])
+                except IOError:
+                    defaults[kind] = None # no such device.
+        _device_table = (devices, defaults)
+        return devices
+
+def _get_device_table():
+
+    with _lock:
+        if _device_table is None:
+            _read_device_table()
+        return _device_table
+
+def get_device_count():
+    return len(_get_device_table()[0])
+
+def get_device_info(device_index):
+    """
+    Return the cached info dict of the device `device_index`.
+    """
+
+    devices = _get_device_table()[0]
+    if not 0 <= device_index < len(devices):
+        raise IOError("Invalid device index: {}".format(device_index))
+    return devices[device_index]
+
+def _get_default_device_info(kind):
+
+    devices, defaults = _get_device_table()
+    if defaults[kind] is None:
+        raise IOError("No default {} device available.".format(kind))
+    return devices[defaults[kind]]
+
+def get_default_input_device_info():
+    return _get_default_device_info("input")
+
+def get_default_output_device_info():
+    return _get_default_device_info("output")
+
+atexit.register(shutdown)
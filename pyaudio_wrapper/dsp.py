@@ -0,0 +1,486 @@
+"""
+The `dsp` submodule: vectorized kernels on audio samples.
+
+Every kernel accepts either a numpy array of samples (such as
+`AudioData.data`) or a raw bytes-like buffer together with its bit width.
+Raw buffers are interpreted as signed integers, as `audioop` does.
+"""
+
+__all__ = ["to_samples", "saturate", "gain", "rms", "peak",
+           "zero_crossing_rate", "dc_offset", "frame_signal", "frame_rms", "default_threshold", "energy_gate", "stft",
+           "noise_profile", "spectral_subtract"]
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from scipy.fft import rfft, irfft, next_fast_len
+from scipy.signal import get_window
+
+def _get_midpoint(dtype):
+    """
+    The value of silence: 0 for signed and float dtypes, 2**(bits-1) for
+    unsigned ones (8 bits wav files are unsigned).
+    """
+
+    dtype = np.dtype(dtype)
+    if dtype.kind == "u":
+        return 2 ** (8 * dtype.itemsize - 1)
+    return 0
+
+def to_samples(data, bit_width = None):
+    """
+    Convert `data` into a numpy array of samples without copying if possible.
+
+    params:
+        `data`: a numpy array or a bytes-like object.
+        `bit_width`: bit width in bytes. Required if `data` is a raw buffer.
+    """
+
+    if isinstance(data, np.ndarray):
+        return data
+
+    assert bit_width in (1, 2, 3, 4), "`bit_width` must be 1, 2, 3 or 4 for raw byte data."
+    if bit_width == 3:
+        # numpy has no 3 bytes integer: sign-extend into int32.
+        raw = np.frombuffer(data, dtype = np.uint8).reshape((-1, 3)).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        return np.where(samples >= 2 ** 23, samples - 2 ** 24, samples)
+
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[bit_width]
+    return np.frombuffer(data, dtype = dtype)
+
+def saturate(array, dtype):
+    """
+    Round `array` and clip it to the range of the integer `dtype`.
+    """
+
+    if array.dtype == dtype:
+        return array
+    info = np.iinfo(dtype)
+    return np.clip(np.round(array), info.min, info.max).astype(dtype)
+
+def gain(data, factor, bit_width = None):
+    """
+    Multiply the samples by `factor`, saturating instead of wrapping around.
+
+    return:
+        A numpy array of the same dtype as the samples.
+    """
+
+    samples = to_samples(data, bit_width)
+    midpoint = _get_midpoint(samples.dtype)
+    # float32 is exact enough for 8 and 16 bits samples and twice as fast.
+    float_type = np.float32 if samples.dtype.itemsize <= 2 else np.float64
+
+    scaled = np.subtract(samples, midpoint, dtype = float_type)
+    scaled *= factor
+    scaled += midpoint
+    info = np.iinfo(samples.dtype)
+    np.rint(scaled, out = scaled)
+    np.clip(scaled, info.min, info.max, out = scaled)
+    return scaled.astype(samples.dtype)
+
+def rms(data, bit_width = None, axis = None):
+    """
+    Root mean square of the samples.
+
+    `axis`: None for the rms over all samples, or -1 for the rms of each
+            channel of a 2-D array like `AudioData.data`.
+    """
+
+    samples = to_samples(data, bit_width)
+    if samples.size == 0:
+        return 0.
+
+    midpoint = _get_midpoint(samples.dtype)
+    if midpoint != 0 or samples.dtype.itemsize > 4:
+        samples = samples.astype(np.float64) - midpoint
+    if axis is None:
+        samples = samples.ravel(order = "K")
+
+    # einsum accumulates the squares without a temporary array.
+    square_sum = np.einsum("...i,...i->...", samples, samples, dtype = np.float64)
+    return np.sqrt(square_sum / samples.shape[-1])
+
+def peak(data, bit_width = None, axis = None):
+    """
+    Maximum absolute value of the samples.
+    """
+
+    samples = to_samples(data, bit_width)
+    if samples.size == 0:
+        return 0
+
+    midpoint = _get_midpoint(samples.dtype)
+    highest = samples.max(axis = axis).astype(np.int64) - midpoint
+    lowest = samples.min(axis = axis).astype(np.int64) - midpoint
+    return np.maximum(highest, -lowest)
+
+def zero_crossing_rate(data, bit_width = None, axis = -1):
+    """
+    Fraction of consecutive samples whose signs differ along `axis`.
+    """
+
+    samples = to_samples(data, bit_width)
+    if samples.shape[axis] < 2:
+        return 0.
+    signs = samples < _get_midpoint(samples.dtype)
+    return np.count_nonzero(np.diff(signs, axis = axis), axis = axis) / float(samples.shape[axis] - 1)
+
+def dc_offset(data, bit_width = None, axis = None):
+    """
+    Mean value of the samples relative to silence.
+    """
+
+    samples = to_samples(data, bit_width)
+    if samples.size == 0:
+        return 0.
+    return np.mean(samples, axis = axis, dtype = np.float64) - _get_midpoint(samples.dtype)
+
+def frame_signal(samples, frame_length, hop_length):
+    """
+    Split the samples into overlapping frames along the last axis.
+
+    No data is copied: the frames are a read-only strided view of `samples`.
+    Trailing samples which do not fill a whole frame are left out.
+
+    return:
+        An array of shape `samples.shape[:-1] + (num_frames, frame_length)`.
+    """
+
+    assert frame_length > 0 and hop_length > 0, "`frame_length` and `hop_length` must be positive."
+    samples = np.asarray(samples)
+    length = samples.shape[-1]
+    num_frames = 1 + (length - frame_length) // hop_length if length >= frame_length else 0
+
+    shape = samples.shape[:-1] + (num_frames, frame_length)
+    strides = samples.strides[:-1] + (samples.strides[-1] * hop_length, samples.strides[-1])
+    return as_strided(samples, shape = shape, strides = strides, writeable = False)
+
+def frame_rms(data, frame_length, hop_length = None, bit_width = None, channels = 1):
+    """
+    Root mean square of each frame, over all channels.
+
+    params:
+        `data`: the samples or a raw buffer of interleaved frames.
+        `frame_length`, `hop_length`: frame size and hop size in frames.
+                                      `hop_length` defaults to `frame_length`.
+        `bit_width`: bit width in bytes if `data` is a raw buffer.
+        `channels`: number of interleaved channels if `data` is a raw buffer.
+
+    return:
+        A 1-D array of float. Frames running past the end of the samples are
+        measured on the samples they cover, so every sample is accounted for.
+    """
+
+    hop_length = frame_length if hop_length is None else hop_length
+    samples = to_samples(data, bit_width)
+    if not isinstance(data, np.ndarray):
+        samples = samples.reshape((-1, channels)).T
+    if samples.ndim == 1:
+        samples = samples[None, :]
+
+    midpoint = _get_midpoint(samples.dtype)
+    if midpoint != 0 or samples.dtype.itemsize > 4:
+        samples = samples.astype(np.float64) - midpoint
+
+    length = samples.shape[-1]
+    frames = frame_signal(samples, frame_length, hop_length)
+    num_full = frames.shape[-2]
+    num_frames = 1 + int(np.ceil(max(length - frame_length, 0) / float(hop_length))) if length else 0
+
+    energy = np.empty(num_frames)
+    energy[:num_full] = np.einsum("cfl,cfl->f", frames, frames, dtype = np.float64) / (frame_length * samples.shape[0])
+    for index in range(num_full, num_frames):
+        tail = samples[:, index * hop_length:]
+        energy[index] = np.einsum("cl,cl->", tail, tail, dtype = np.float64) / tail.size
+    return np.sqrt(energy)
+
+def default_threshold(energy, percentile = 10, factor = 2.):
+    """
+    Energy threshold between silence and sound: `factor` times the noise
+    floor, estimated as the `percentile`-th percentile of the frame energies.
+    It is the default threshold of `energy_gate` and `vad`.
+
+    params:
+        `energy`: the frame energies, such as the output of `frame_rms`.
+
+    return:
+        The threshold, 0 if there is no frame.
+    """
+
+    if len(energy) == 0:
+        return 0.
+    return factor * np.percentile(energy, percentile)
+
+def energy_gate(samples, frame_length, threshold = None, attenuation = 0., fade_length = 0):
+    """
+    Attenuate the frames whose rms is below `threshold`.
+
+    params:
+        `samples`: the samples, 2-D arrays like `AudioData.data` are gated on
+                   the rms over all channels.
+        `frame_length`: frame size in samples.
+        `threshold`: rms threshold. If None, it is set at twice the noise floor,
+                     estimated as the 10th percentile of the frame rms.
+        `attenuation`: gain applied to the frames below the threshold.
+        `fade_length`: length of the linear crossfades between gated and open
+                       frames in samples. It can not exceed `frame_length`.
+
+    return:
+        The gated samples, transposed to (samples, channels) for 2-D input,
+        which is the layout of the raw byte data.
+    """
+
+    energy = frame_rms(samples, frame_length)
+    if threshold is None:
+        threshold = default_threshold(energy)
+    gains = np.where(energy >= threshold, 1., attenuation)
+
+    length = samples.shape[-1]
+    source = samples.T
+    output = np.array(source)
+    midpoint = _get_midpoint(output.dtype)
+
+    def apply_gain(values, gain):
+        if np.ndim(gain) == 1 and values.ndim == 2:
+            gain = gain[:, None]
+        return saturate((values.astype(np.float64) - midpoint) * gain + midpoint, output.dtype)
+
+    gated = np.repeat(gains < 1., frame_length)[:length]
+    if attenuation == 0:
+        output[gated] = midpoint
+    else:
+        output[gated] = apply_gain(source[gated], attenuation)
+
+    # Crossfade linearly around the boundaries where the gain changes.
+    fade_length = min(int(fade_length), frame_length)
+    edges = np.nonzero(np.diff(gains))[0] + 1
+    if fade_length > 0 and len(edges):
+        half = fade_length // 2
+        offsets = np.arange(-half, fade_length - half)
+        index = edges[:, None] * frame_length + offsets[None, :]
+        ramp = gains[edges - 1][:, None] + \
+               (gains[edges] - gains[edges - 1])[:, None] * (offsets + half + .5) / fade_length
+        valid = (index >= 0) & (index < length)
+        index, ramp = index[valid], ramp[valid]
+        output[index] = apply_gain(source[index], ramp)
+
+    return output
+
+def stft(samples, frame_length, hop_length, window = "hann", n_fft = None, block_size = 1024, workers = None):
+    """
+    Short-time Fourier transform along the last axis with real FFTs.
+
+    params:
+        `samples`: the samples. 2-D arrays like `AudioData.data` are
+                   transformed channel by channel. Unsigned samples are
+                   shifted so that silence is 0.
+        `frame_length`, `hop_length`: frame size and hop size in samples.
+        `window`: any window supported by `scipy.signal.get_window`.
+        `n_fft`: FFT size. Default is the smallest power of two not less than
+                 `frame_length`. Frames are zero-padded to this size.
+        `block_size`: number of frames transformed at once, which bounds the
+                      size of the temporary arrays.
+        `workers`: number of threads used by `scipy.fft.rfft`.
+
+    return:
+        A complex array of shape `samples.shape[:-1] + (num_frames, n_fft//2 + 1)`.
+        The last frame is zero-padded so that every sample is covered.
+    """
+
+    if n_fft is None:
+        n_fft = 1 << int(np.ceil(np.log2(frame_length)))
+    assert n_fft >= frame_length, "`n_fft` must not be less than `frame_length`."
+    coefs = get_window(window, frame_length)
+
+    samples = np.asarray(samples)
+    # Subtracting a float also casts the samples, so unsigned ones can not wrap.
+    midpoint = float(_get_midpoint(samples.dtype))
+    length = samples.shape[-1]
+    frames = frame_signal(samples, frame_length, hop_length)
+    num_full = frames.shape[-2]
+    num_frames = 1 + int(np.ceil(max(length - frame_length, 0) / float(hop_length)))
+
+    result = np.empty(samples.shape[:-1] + (num_frames, n_fft // 2 + 1), dtype = np.complex128)
+    for start in range(0, num_full, block_size):
+        block = (frames[..., start:start + block_size, :] - midpoint) * coefs
+        result[..., start:start + block.shape[-2], :] = rfft(block, n = n_fft, axis = -1, workers = workers)
+
+    # Frames running past the end of the samples are zero-padded.
+    for index in range(num_full, num_frames):
+        tail = samples[..., index * hop_length:]
+        padding = [(0, 0)] * (samples.ndim - 1) + [(0, frame_length - tail.shape[-1])]
+        frame = np.pad(tail - midpoint, padding, mode = "constant") * coefs
+        result[..., index, :] = rfft(frame, n = n_fft, axis = -1, workers = workers)
+    return result
+
+def _gather_frames(samples, starts, frame_length):
+    """
+    Copy the frames of the 2-D `samples` starting at `starts` as float,
+    relative to silence. Samples outside of the signal are zeros.
+
+    return:
+        An array of shape (channels, len(starts), frame_length).
+    """
+
+    index = starts[:, None] + np.arange(frame_length)[None, :]
+    valid = (index >= 0) & (index < samples.shape[-1])
+    frames = samples[:, np.where(valid, index, 0)].astype(np.float64)
+    frames -= _get_midpoint(samples.dtype)
+    frames *= valid
+    return frames
+
+def _get_overlap_frames(length, frame_length, hop_length):
+    """
+    Frame layout of the overlap-add methods: the first frame starts
+    `frame_length - hop_length` samples before the signal, so that every
+    sample is covered by the same number of frames.
+
+    return:
+        (starts, num_overlaps): the start of each frame and the number of
+        hops spanned by a frame.
+    """
+
+    assert 0 < hop_length <= frame_length, "`hop_length` must be positive and not larger than `frame_length`."
+    pad = frame_length - hop_length
+    num_frames = (length - 1 + pad) // hop_length + 1 if length else 0
+    return np.arange(num_frames) * hop_length - pad, -(-frame_length // hop_length)
+
+def noise_profile(samples, frame_length, hop_length = None, window = "hann", percentile = 10, block_size = 256):
+    """
+    Estimate the power spectrum of the noise from the quietest frames.
+
+    params:
+        `samples`: the samples. 2-D arrays like `AudioData.data` get a
+                   profile per channel.
+        `frame_length`, `hop_length`: frame size and hop size in samples.
+                                      `hop_length` defaults to `frame_length // 4`.
+        `window`: any window supported by `scipy.signal.get_window`.
+        `percentile`: the frames whose energy is not above this percentile
+                      are averaged. Use 100 if `samples` is noise only.
+        `block_size`: number of frames processed at once.
+
+    return:
+        An array of shape `samples.shape[:-1] + (n_fft//2 + 1,)` where `n_fft`
+        is `scipy.fft.next_fast_len(frame_length)`.
+    """
+
+    assert block_size >= 1, "`block_size` must be positive."
+    hop_length = max(1, frame_length // 4) if hop_length is None else hop_length
+    samples = np.asarray(samples)
+    n_fft = next_fast_len(frame_length, real = True)
+    if samples.shape[-1] == 0:
+        return np.zeros(samples.shape[:-1] + (n_fft // 2 + 1,))
+
+    flat = samples.reshape((-1, samples.shape[-1]))
+    coefs = get_window(window, frame_length)
+    starts = _get_overlap_frames(flat.shape[-1], frame_length, hop_length)[0]
+
+    energy = np.empty(len(starts))
+    for start in range(0, len(starts), block_size):
+        frames = _gather_frames(flat, starts[start:start + block_size], frame_length) * coefs
+        energy[start:start + frames.shape[1]] = np.einsum("cfl,cfl->f", frames, frames)
+
+    power = np.zeros((flat.shape[0], n_fft // 2 + 1))
+    quiet = starts[energy <= np.percentile(energy, percentile)] if len(energy) else starts
+    for start in range(0, len(quiet), block_size):
+        frames = _gather_frames(flat, quiet[start:start + block_size], frame_length) * coefs
+        spectrum = rfft(frames, n = n_fft, axis = -1)
+        power += np.sum(spectrum.real ** 2 + spectrum.imag ** 2, axis = 1)
+    power /= max(len(quiet), 1)
+    return power.reshape(samples.shape[:-1] + power.shape[-1:])
+
+def spectral_subtract(samples, frame_length, hop_length = None, noise = None, window = "hann",
+                      over_subtraction = 2., floor = 0.05, percentile = 10, block_size = 256, workers = None):
+    """
+    Denoise by spectral subtraction and resynthesize by weighted overlap-add.
+
+    Each frame of the STFT is scaled by the gain
+    `sqrt(max(1 - over_subtraction * noise / power, floor**2))`. The frames
+    are processed `block_size` at a time, and the output does not depend on
+    `block_size`: it is identical to processing the whole signal at once.
+
+    params:
+        `samples`: the samples. 2-D arrays like `AudioData.data` are
+                   processed channel by channel.
+        `frame_length`, `hop_length`: frame size and hop size in samples.
+                                      `hop_length` defaults to `frame_length // 4`.
+        `noise`: the noise power spectrum, as returned by `noise_profile`.
+                 If None, it is estimated from the quietest frames of `samples`.
+        `window`: any window supported by `scipy.signal.get_window`. The
+                  analysis and synthesis windows are the same.
+        `over_subtraction`: multiplier of the noise spectrum.
+        `floor`: minimum gain, which limits the musical noise.
+        `percentile`: see `noise_profile`.
+        `block_size`: number of frames processed at once, which bounds the
+                      size of the temporary arrays.
+        `workers`: number of threads used by `scipy.fft`.
+
+    return:
+        The denoised samples, transposed to (samples, channels) for 2-D
+        input, which is the layout of the raw byte data.
+    """
+
+    assert block_size >= 1, "`block_size` must be positive."
+    hop_length = max(1, frame_length // 4) if hop_length is None else hop_length
+    samples = np.asarray(samples)
+    if samples.shape[-1] == 0:
+        return np.empty(samples.shape[::-1], dtype = samples.dtype)
+
+    flat = samples.reshape((-1, samples.shape[-1]))
+    num_channels, length = flat.shape
+    n_fft = next_fast_len(frame_length, real = True)
+    coefs = get_window(window, frame_length)
+
+    if noise is None:
+        noise = noise_profile(samples, frame_length, hop_length, window, percentile)
+    noise = np.reshape(noise, (-1, 1, n_fft // 2 + 1))
+    assert noise.shape[0] in (1, num_channels), "`noise` does not match the number of channels."
+
+    starts, num_overlaps = _get_overlap_frames(length, frame_length, hop_length)
+    # The squared window overlap-added is periodic with period `hop_length`.
+    window_sum = np.zeros(num_overlaps * hop_length)
+    window_sum[:frame_length] = coefs ** 2
+    window_sum = window_sum.reshape((num_overlaps, hop_length)).sum(axis = 0)
+    assert window_sum.min() > 1e-8, "The window does not overlap-add to a positive sum with this `hop_length`."
+
+    output = np.empty(samples.shape[::-1], dtype = samples.dtype)
+    output_2d = output.reshape((length, num_channels))
+    midpoint = _get_midpoint(samples.dtype)
+    tiny = np.finfo(np.float64).tiny
+
+    # Overlap-added samples of the frames of the previous blocks still
+    # expecting contributions, in hops of `hop_length`.
+    carry = np.zeros((num_channels, num_overlaps - 1, hop_length))
+    for first in range(0, len(starts), block_size):
+        block_starts = starts[first:first + block_size]
+        num_frames = len(block_starts)
+
+        spectrum = rfft(_gather_frames(flat, block_starts, frame_length) * coefs,
+                        n = n_fft, axis = -1, workers = workers)
+        power = np.maximum(spectrum.real ** 2 + spectrum.imag ** 2, tiny)
+        spectrum *= np.sqrt(np.maximum(1. - over_subtraction * noise / power, floor ** 2))
+
+        frames = np.zeros((num_channels, num_frames, num_overlaps * hop_length))
+        frames[..., :frame_length] = irfft(spectrum, n = n_fft, axis = -1, workers = workers)[..., :frame_length]
+        frames[..., :frame_length] *= coefs
+        frames = frames.reshape((num_channels, num_frames, num_overlaps, hop_length))
+
+        # Add the frames in order, so that each sample sums its frames in the
+        # same order whatever the block size.
+        overlapped = np.zeros((num_channels, num_frames + num_overlaps - 1, hop_length))
+        overlapped[:, :num_overlaps - 1] = carry
+        for overlap in reversed(range(num_overlaps)):
+            overlapped[:, overlap:overlap + num_frames] += frames[:, :, overlap]
+        carry = overlapped[:, num_frames:].copy()
+
+        # The samples before the next block are complete. With small blocks,
+        # they may all lie in the padding before the signal.
+        done = (overlapped[:, :num_frames] / window_sum).reshape((num_channels, -1))
+        begin = block_starts[0]
+        low, high = max(begin, 0), min(begin + done.shape[-1], length)
+        if high <= low:
+            continue
+        output_2d[low:high] = saturate(done[:, low - begin:high - begin] + midpoint, samples.dtype).T
+
+    return output
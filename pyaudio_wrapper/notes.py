@@ -12,42 +12,42 @@ SAMPLE_RATE = 16000
 x = np.linspace(0, 1, SAMPLE_RATE)
 
 y = (2**8*np.sin(2**(-9./12)*440*2*np.pi*x)).astype(np.int16)
-C = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+C = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-8./12)*440*2*np.pi*x)).astype(np.int16)
-D_m = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+D_m = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-7./12)*440*2*np.pi*x)).astype(np.int16)
-D = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+D = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-6./12)*440*2*np.pi*x)).astype(np.int16)
-E_m = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+E_m = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-5./12)*440*2*np.pi*x)).astype(np.int16)
-E = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+E = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-4./12)*440*2*np.pi*x)).astype(np.int16)
-F = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+F = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-3./12)*440*2*np.pi*x)).astype(np.int16)
-G_m = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+G_m = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-2./12)*440*2*np.pi*x)).astype(np.int16)
-G = 20*WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+G = 20*WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(-1./12)*440*2*np.pi*x)).astype(np.int16)
-A_m = WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+A_m = WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(440*2*np.pi*x)).astype(np.int16)
-A = WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+A = WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(1./12)*440*2*np.pi*x)).astype(np.int16)
-B_m = WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+B_m = WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
 y = (2**8*np.sin(2**(2./12)*440*2*np.pi*x)).astype(np.int16)
-B = WavAudioData(y.tostring(), SAMPLE_RATE, 2, 1, np.int16)[:500]
+B = WavAudioData(y.tobytes(), SAMPLE_RATE, 2, 1, np.int16)[:500]
 
-empty =  WavAudioData(np.zeros(SAMPLE_RATE, dtype = np.int16).tostring(), SAMPLE_RATE, 2, 1, np.int16)
+empty =  WavAudioData(np.zeros(SAMPLE_RATE, dtype = np.int16).tobytes(), SAMPLE_RATE, 2, 1, np.int16)
 half_empty = empty[:250]
 
 bee_song = (G + E + E + half_empty + \
@@ -0,0 +1,375 @@
+"""
+The `playback` submodule: a callback-driven playback engine.
+
+An engine plays the byte data of one audio format from the PortAudio
+thread. Playing returns at once with a `PlaybackHandle`, and starting a new
+clip cancels the current one unless it is queued. The output stream stays
+open between clips, and is closed once the engine has been idle for a
+while, so the shared PortAudio context can be released.
+
+ex:
+    handle = audio_data.play(block = False)
+    ...
+    handle.stop()
+"""
+
+__all__ = ["PlaybackEngine", "PlaybackHandle", "get_engine", "close_engines"]
+
+from collections import deque
+import atexit
+import threading
+import time
+
+import pyaudio
+
+from .devices import acquire_audio, release_audio, get_default_output_device_info
+
+class PlaybackHandle(object):
+    """
+    A clip played or queued by a `PlaybackEngine`.
+    """
+
+    def __init__(self, engine, byte_data):
+
+        self.__engine = engine
+        self.__data = memoryview(byte_data).cast("B")
+        self.__position = 0
+        self.__stopped = False
+        self.__done = threading.Event()
+        self.__end_time = 0. # when the last frame leaves the device, in `time.monotonic()`
+
+    @property
+    def done(self):
+        """
+        Whether the clip has been played or stopped.
+        """
+        return self.__done.is_set() and time.monotonic() >= self.__end_time
+
+    @property
+    def stopped(self):
+        return self.__stopped
+
+    @property
+    def position(self):
+        """
+        Number of bytes handed to the device so far.
+        """
+        return self.__position
+
+    def stop(self):
+        """
+        Stop the clip, or remove it from the queue if it is not playing yet.
+        """
+        self.__engine._cancel(self)
+
+    def wait(self, timeout = None):
+        """
+        Wait until the clip is done.
+
+        return:
+            False if `timeout` (in seconds) expired first.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self.__done.wait(timeout):
+            return False
+
+        # The last frames may still be in the buffers of the device.
+        end_time = self.__end_time
+        if deadline is not None and deadline < end_time:
+            time.sleep(max(deadline - time.monotonic(), 0))
+            return False
+        time.sleep(max(end_time - time.monotonic(), 0))
+        return True
+
+    def _take(self, nbytes):
+        """
+        Return the next `nbytes` bytes at most. Called by the engine only.
+        """
+
+        chunk = self.__data[self.__position:self.__position + nbytes]
+        self.__position += len(chunk)
+        return chunk
+
+    @property
+    def _remaining(self):
+        return len(self.__data) - self.__position
+
+    def _finish(self, stopped = False, end_time = 0.):
+
+        self.__stopped = stopped
+        self.__end_time = end_time
+        self.__done.set()
+
+
+class PlaybackEngine(object):
+    """
+    Play byte data of one format on the default output device.
+
+    The output stream is opened on the default output device when there is
+    something to play, and stops by itself once the queue is empty. It is
+    closed, and the PortAudio context released, after `idle_timeout`
+    seconds without anything to play. The stream callback only records when
+    the engine became idle: the stream is closed by a thread of the engine.
+    """
+
+    def __init__(self, sample_rate, bit_width, channels, format = None, frames_per_buffer = 1024,
+                 idle_timeout = 5.):
+
+        if format is None:
+            format = pyaudio.get_format_from_width(bit_width)
+        self.__sample_rate = sample_rate
+        self.__channels = channels
+        self.__format = format
+        self.__frames_per_buffer = frames_per_buffer
+        self.__frame_width = bit_width * channels
+        silence = b"\x80" if format == pyaudio.paUInt8 else b"\x00"
+        self.__silence = silence * (frames_per_buffer * self.__frame_width)
+        self.__idle_timeout = idle_timeout
+
+        self.__lock = threading.Lock()
+        self.__current = None
+        self.__queue = deque()
+        self.__running = False
+        self.__idle_since = None # when the queue ran out, in `time.monotonic()`
+        self.__stream = None
+        self.__latency = 0.
+        self.__closed = False
+
+        self.__wakeup = threading.Event()
+        self.__idle_watcher = threading.Thread(target = self.__watch_idle)
+        self.__idle_watcher.daemon = True
+        self.__idle_watcher.start()
+
+    @property
+    def closed(self):
+        return self.__closed
+
+    @property
+    def playing(self):
+        """
+        Whether a clip is being played or queued.
+        """
+        return self.__current is not None
+
+    @property
+    def idle(self):
+        """
+        Whether the output stream is closed because there was nothing to play.
+        """
+        return self.__stream is None
+
+    def __open_stream(self):
+
+        audio = acquire_audio()
+        try:
+            stream = audio.open(
+                output_device_index = get_default_output_device_info()["index"],
+                format = self.__format,
+                rate = self.__sample_rate,
+                channels = self.__channels,
+                output = True,
+                frames_per_buffer = self.__frames_per_buffer,
+                stream_callback = self.__on_output,
+                start = False)
+        except:
+            release_audio()
+            raise
+        self.__latency = stream.get_output_latency()
+        return stream
+
+    @staticmethod
+    def __close_stream(stream):
+
+        # stop_stream plays the buffered frames out before returning.
+        stream.stop_stream()
+        stream.close()
+        release_audio()
+
+    def play(self, byte_data, queue = False):
+        """
+        Play `byte_data`, a bytes-like object of whole frames. No data is copied.
+
+        params:
+            `queue`: if True, play after the clips already queued. Otherwise
+                     stop them and play immediately.
+
+        return:
+            A PlaybackHandle.
+        """
+
+        assert not self.closed, "The playback engine is closed."
+        handle = PlaybackHandle(self, byte_data)
+        with self.__lock:
+            if not queue:
+                self.__cancel_all()
+            if self.__current is None:
+                self.__current = handle
+            else:
+                self.__queue.append(handle)
+            restart = not self.__running
+            self.__running = True
+            if restart:
+                self.__idle_since = None
+                stream = self.__stream
+
+        if restart:
+            if stream is None:
+                try:
+                    stream = self.__stream = self.__open_stream()
+                except:
+                    self.stop()
+                    with self.__lock:
+                        self.__running = False
+                    raise
+            else:
+                # The stream completed when the queue ran out.
+                stream.stop_stream()
+            stream.start_stream()
+        return handle
+
+    def stop(self):
+        """
+        Stop the current clip and empty the queue.
+        """
+
+        with self.__lock:
+            self.__cancel_all()
+
+    def close(self):
+        """
+        Stop playing and close the output stream. The engine can not be used anymore.
+        """
+
+        if self.closed:
+            return
+        self.__closed = True
+        with self.__lock:
+            self.__cancel_all()
+            stream, self.__stream = self.__stream, None
+        self.__wakeup.set()
+        if stream is not None:
+            self.__close_stream(stream)
+
+    def __watch_idle(self):
+        """
+        Close the output stream once the engine has been idle for
+        `idle_timeout` seconds. Runs in its own thread until the engine is closed.
+        """
+
+        while True:
+            self.__wakeup.wait()
+            self.__wakeup.clear()
+            with self.__lock:
+                if self.__closed:
+                    return
+                idle_since = self.__idle_since
+            if idle_since is None:
+                continue
+
+            if self.__wakeup.wait(max(idle_since + self.__idle_timeout - time.monotonic(), 0)):
+                continue # closed, or idle again: check again.
+            with self.__lock:
+                # The stream may have been started again meanwhile.
+                if self.__running or self.__idle_since != idle_since:
+                    continue
+                self.__idle_since = None
+                stream, self.__stream = self.__stream, None
+            if stream is not None:
+                self.__close_stream(stream)
+
+    def _cancel(self, handle):
+
+        with self.__lock:
+            if handle is self.__current:
+                self.__current = self.__queue.popleft() if self.__queue else None
+            elif handle in self.__queue:
+                self.__queue.remove(handle)
+            else:
+                return
+            handle._finish(stopped = True)
+
+    def __cancel_all(self):
+
+        handles = list(self.__queue)
+        if self.__current is not None:
+            handles.insert(0, self.__current)
+        self.__current = None
+        self.__queue.clear()
+        for handle in handles:
+            handle._finish(stopped = True)
+
+    def __on_output(self, in_data, frame_count, time_info, status_flags):
+        """
+        The stream callback, called by PortAudio from its own thread.
+        """
+
+        remaining = frame_count * self.__frame_width
+        chunks = []
+        with self.__lock:
+            if self.__current is None:
+                self.__running = False
+                self.__idle_since = time.monotonic()
+                self.__wakeup.set()
+                return (self.__get_silence(remaining), pyaudio.paComplete)
+
+            # The first frame of this buffer is played after the output latency.
+            latency = time_info.get("output_buffer_dac_time", 0) - time_info.get("current_time", 0)
+            start_time = time.monotonic() + (latency if latency > 0 else self.__latency)
+            while remaining and self.__current is not None:
+                chunk = self.__current._take(remaining)
+                chunks.append(chunk)
+                remaining -= len(chunk)
+                if self.__current._remaining == 0:
+                    played = frame_count - remaining // self.__frame_width
+                    self.__current._finish(end_time = start_time + played / float(self.__sample_rate))
+                    self.__current = self.__queue.popleft() if self.__queue else None
+
+        if remaining:
+            chunks.append(self.__get_silence(remaining))
+        return (b"".join(chunks), pyaudio.paContinue)
+
+    def __get_silence(self, nbytes):
+
+        if nbytes > len(self.__silence):
+            self.__silence = self.__silence[:1] * nbytes
+        return self.__silence[:nbytes]
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(sample_rate, bit_width, channels, format = None):
+    """
+    Return the shared engine playing the given format, created on first use.
+    """
+
+    if format is None:
+        format = pyaudio.get_format_from_width(bit_width)
+    key = (sample_rate, bit_width, channels, format)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None or engine.closed:
+            engine = _engines[key] = PlaybackEngine(sample_rate, bit_width, channels, format)
+        return engine
+
+def close_engines(stop = True):
+    """
+    Close all the shared engines and their output streams. They are created
+    again by the next `get_engine`.
+
+    params:
+        `stop`: if False, no engine is closed while a clip is being played.
+
+    Raise:
+        RuntimeError: if `stop` is False and a clip is being played.
+    """
+
+    with _engines_lock:
+        if not stop and any(engine.playing for engine in _engines.values()):
+            raise RuntimeError("Audio is being played.")
+        for engine in _engines.values():
+            engine.close()
+        _engines.clear()
+
+atexit.register(close_engines)
@@ -2,7 +2,8 @@ __all__ = ["Recorder"]
 
 # standard libraries.
 from io import BytesIO
-import wave, os, audioop
+import wave, os
+import warnings
 
 # third party packages
 import pyaudio
@@ -11,9 +12,11 @@ from scipy.io import wavfile
 
 # submodules
 from .audio_data import AudioData, WavAudioData
+from . import dsp
 from .exceptions import PauseTimeout
 from ._source_abc import AudioSourceABC
 from ._recorder_abc import AbstractRecorder
+from ._segmenter import UtteranceSegmenter
 
 class Recorder(AbstractRecorder):
 
@@ -21,96 +24,238 @@ class Recorder(AbstractRecorder):
         self.__wav_data = None
 
     ## Reimplement required methods ##
-    def record(self, source, offset = 0, max_pause_time = 3, adjust_ambient_noise = False, wav = True, verbose = False):
+    def record(self, source, offset = 0, max_pause_time = 3, adjust_ambient_noise = False, wav = True, verbose = False,
+               max_duration = None, energy_threshold = None, pre_roll = 0.3):
         """
         Return the recorded audio data.
 
         source: An AudioSource instance.
         offset: offset of time in second.
+        max_duration: maximum duration of the recording in second. The
+                      recording stops once it is reached. Default is no limit.
+        energy_threshold: rms threshold between silence and sound. By default,
+                          it follows the noise floor during the whole capture,
+                          so no calibration is needed. With `adjust_ambient_noise`,
+                          the ambient noise measured first is used as the
+                          initial noise floor. The two options can not be
+                          used together.
+        adjust_ambient_noise: deprecated, since the noise floor is tracked
+                              anyway. The prompts of the calibration are
+                              printed if `verbose` is True.
+        pre_roll: length in second of the audio before the onset which is
+                  kept in a ring buffer and prepended to the recording, so
+                  the onset is not clipped even with small chunks.
         """
 
-        ## Wait for offset to be reached.
-        ## All data read from the source during offset time will be disgard.
+        self.set_source(source)
+        self.__warn_adjust_ambient_noise(adjust_ambient_noise)
+        recording = self.__recording(source, offset, max_pause_time, adjust_ambient_noise, verbose, max_duration,
+                                     energy_threshold, pre_roll)
+        byte_data = self.__run(recording, source.readinto)
+        return self.__to_audio_data(source, byte_data, wav)
+
+    async def record_async(self, source, offset = 0, max_pause_time = 3, adjust_ambient_noise = False, wav = True, verbose = False,
+                           max_duration = None, energy_threshold = None, pre_roll = 0.3):
+        """
+        Same as `record`, but wait for the data without blocking the event
+        loop. `source` must be used with `async with`.
+
+        ex:
+            async with Microphone() as source:
+                audio_data = await recorder.record_async(source)
+        """
 
         self.set_source(source)
-        seconds_per_chunk = float(self.source.CHUNK_SIZE)/ self.source.SAMPLE_RATE # seconds per chunk.
+        self.__warn_adjust_ambient_noise(adjust_ambient_noise)
+        recording = self.__recording(source, offset, max_pause_time, adjust_ambient_noise, verbose, max_duration,
+                                     energy_threshold, pre_roll)
+        try:
+            buffer = next(recording)
+            while True:
+                await source.readinto_async(buffer)
+                buffer = recording.send(None)
+        except StopIteration as stop:
+            byte_data = stop.value
+        return self.__to_audio_data(source, byte_data, wav)
+
+    @staticmethod
+    def __warn_adjust_ambient_noise(adjust_ambient_noise):
 
         if adjust_ambient_noise:
-            energy_threshold = self.get_ambient_noice_energy(sample_time = max_pause_time)
-        else:
-            energy_threshold = 50
+            warnings.warn("`adjust_ambient_noise` is deprecated: the energy threshold follows the noise floor "
+                          "without calibration.", DeprecationWarning, stacklevel = 3)
+
+    @staticmethod
+    def __run(recording, readinto):
+        """
+        Run the generator `recording` until it returns, filling each buffer
+        it yields with `readinto`.
+        """
+
+        try:
+            buffer = next(recording)
+            while True:
+                readinto(buffer)
+                buffer = recording.send(None)
+        except StopIteration as stop:
+            return stop.value
+
+    @staticmethod
+    def __to_audio_data(source, byte_data, wav):
+
+        if wav:
+            return WavAudioData(byte_data, source.SAMPLE_RATE, source.BIT_WIDTH, source.CHANNELS)
+        
+        return AudioData(byte_data, source.SAMPLE_RATE, source.BIT_WIDTH, source.CHANNELS)
+
+    def __recording(self, source, offset, max_pause_time, adjust_ambient_noise, verbose, max_duration = None,
+                    energy_threshold = None, pre_roll = 0.):
+        """
+        The recording process, as a generator yielding the buffers to be
+        filled with the next chunk of `source`. It returns the bytearray of
+        the first utterance. It only refers to `source`, so concurrent
+        recordings can share the recorder.
+        """
+
+        if adjust_ambient_noise and energy_threshold is not None:
+            raise ValueError("`adjust_ambient_noise` can not be used with a fixed `energy_threshold`.")
+
+        seconds_per_chunk = float(source.CHUNK_SIZE)/ source.SAMPLE_RATE # seconds per chunk.
+
+        noise_floor = None
+        if adjust_ambient_noise:
+            noise_floor = yield from self.__ambient_noice_energy(source, max_pause_time, verbose)
 
         if verbose:
-            print("The energy threshold has been set as {}. (default: 50)".format(energy_threshold))
+            if energy_threshold is None:
+                print("The energy threshold follows the noise floor.")
+            else:
+                print("The energy threshold has been set as {}.".format(energy_threshold))
         
+        segmenter = UtteranceSegmenter(source.SAMPLE_RATE, source.BIT_WIDTH, source.CHANNELS,
+                                       energy_threshold = energy_threshold,
+                                       hangover = max_pause_time,
+                                       pre_roll = pre_roll,
+                                       max_duration = max_duration,
+                                       noise_floor = noise_floor)
+
+        ## Wait for offset to be reached.
+        ## All data read from the source during offset time will be disgard.
         offset_reached = False
         elapsed_time = 0
 
         while not offset_reached:
             
-            self.source.read() # The data read during this time is disgarded.
+            yield segmenter.reserve(source.CHUNK_SIZE)
+            segmenter.skip() # The data is disgarded, only the noise floor is updated.
             elapsed_time += seconds_per_chunk
             
             if elapsed_time > offset:
                 offset_reached = True
 
-        ## Detecting sound.
-        frames = []
-        start_phase = False
-        while not start_phase:
-            data = self.source.read()
+        ## Detecting sound, then recording until the pause time is reached.
+        while True:
+            yield segmenter.reserve(source.CHUNK_SIZE)
             elapsed_time += seconds_per_chunk
 
-            energy = audioop.rms(data, self.source.BIT_WIDTH)
-            if energy > energy_threshold:
-                frames.append(data)
-                start_phase = True
-            elif elapsed_time - offset > max_pause_time:
+            in_speech = segmenter.in_speech
+            utterances = segmenter.process()
+            if verbose and not in_speech and (segmenter.in_speech or utterances):
+                print("Sound detected. Start recording.")
+            if utterances:
+                utterance = utterances[0]
+                break
+
+            if not segmenter.in_speech and elapsed_time - offset > max_pause_time:
                 raise PauseTimeout("Pause time too long. Timeout the recording process.")
 
         if verbose:
-            print("Sound detected. Start recording.")
+            if segmenter.truncated:
+                print('Maximum duration reached. Stopping recording process.')
+            else:
+                print('Pause time reached. Stopping recording process.')
+                
+        return utterance
+
+    def listen(self, source, max_pause_time = 1, pre_roll = 0.3, energy_threshold = None, max_duration = None, wav = True):
+        """
+        Capture continuously and yield each utterance as soon as it ends.
 
-        pause_time = 0
+        The stream of `source` is never stopped, so no sample is lost between
+        utterances, provided the consumer is fast enough. Use an AudioSource
+        in callback mode to absorb slow consumers.
 
+        params:
+            `source`: an AudioSource instance.
+            `max_pause_time`: hangover in second. An utterance ends once the
+                              silence lasts this long.
+            `pre_roll`: length in second of the audio before the onset
+                        which is prepended to each utterance.
+            `energy_threshold`: rms threshold between silence and sound. By
+                                default it adapts continuously to the noise floor.
+            `max_duration`: maximum duration of an utterance in second.
+            `wav`: yield WavAudioData if True, AudioData otherwise.
+
+        ex:
+            with Microphone(callback = True) as source:
+                for audio_data in recorder.listen(source):
+                    ...
+        """
+
+        self.set_source(source)
+        segmenter = UtteranceSegmenter(source.SAMPLE_RATE, source.BIT_WIDTH, source.CHANNELS,
+                                       energy_threshold, max_pause_time, pre_roll, max_duration)
         while True:
+            source.readinto(segmenter.reserve(source.CHUNK_SIZE))
+            for utterance in segmenter.process():
+                yield self.__to_audio_data(source, utterance, wav)
 
-            data = self.source.read()
-            if audioop.rms(data, self.source.BIT_WIDTH) < energy_threshold:
-                pause_time += seconds_per_chunk
-            else:
-                pause_time = 0
-            
-            frames.append(data)
+    async def listen_async(self, source, max_pause_time = 1, pre_roll = 0.3, energy_threshold = None, max_duration = None, wav = True):
+        """
+        Same as `listen`, as an asynchronous iterator. `source` must be used
+        with `async with`.
+        """
 
-            if pause_time >= max_pause_time:
-                if verbose:
-                    print('Pause time reached. Stopping recording process.')
-                break
-                
-        byte_data = b''.join(frames)
-        if wav:
-            return WavAudioData(byte_data, source.SAMPLE_RATE, source.BIT_WIDTH, source.CHANNELS)
-        
-        return AudioData(byte_data, source.SAMPLE_RATE, source.BIT_WIDTH, source.CHANNELS)
+        self.set_source(source)
+        segmenter = UtteranceSegmenter(source.SAMPLE_RATE, source.BIT_WIDTH, source.CHANNELS,
+                                       energy_threshold, max_pause_time, pre_roll, max_duration)
+        while True:
+            await source.readinto_async(segmenter.reserve(source.CHUNK_SIZE))
+            for utterance in segmenter.process():
+                yield self.__to_audio_data(source, utterance, wav)
 
-    def get_ambient_noice_energy(self, sample_time = 3):
+    def get_ambient_noice_energy(self, sample_time = 3, verbose = False):
+        """
+        Deprecated: the energy threshold follows the noise floor without
+        calibration. Return the rms of the source over `sample_time` seconds.
+        """
+
+        warnings.warn("`get_ambient_noice_energy` is deprecated: the energy threshold follows the noise floor "
+                      "without calibration.", DeprecationWarning, stacklevel = 2)
+        return self.__run(self.__ambient_noice_energy(self.source, sample_time, verbose), self.source.readinto)
+
+    def __ambient_noice_energy(self, source, sample_time, verbose = False):
 
         assert isinstance(sample_time, int), "`sample_time` must be integer."
 
-        print("Detecting ambient noice level.")
-        print("Please keep silent for {} second(s).".format(sample_time))
+        if verbose:
+            print("Detecting ambient noice level.")
+            print("Please keep silent for {} second(s).".format(sample_time))
         
-        frames = []
+        # The chunks are read into the same buffer, only their energy is kept.
+        chunk = bytearray(source.CHUNK_SIZE * source.BIT_WIDTH * source.CHANNELS)
+        square_sum = 0.
+        num_chunks = 0
         elapsed_time = 0
-        seconds_per_chunk = float(self.source.CHUNK_SIZE) / self.source.SAMPLE_RATE 
+        seconds_per_chunk = float(source.CHUNK_SIZE) / source.SAMPLE_RATE 
         
         while elapsed_time < sample_time:
-            frames.append(self.source.read())
+            yield chunk
+            square_sum += dsp.rms(chunk, source.BIT_WIDTH) ** 2
+            num_chunks += 1
             elapsed_time += seconds_per_chunk
         
-        data = b''.join(frames)
-        energy = audioop.rms(data, self.source.BIT_WIDTH)
+        energy = (square_sum / num_chunks) ** .5 if num_chunks else 0.
         return energy
 
 
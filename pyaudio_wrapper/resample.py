@@ -0,0 +1,235 @@
+"""
+The `resample` submodule: sample rate conversion built on numpy and scipy.
+"""
+
+__all__ = ["resample", "StreamingResampler"]
+
+from fractions import Fraction
+
+import numpy as np
+from scipy.signal import firwin, resample_poly
+
+def _get_up_down(in_rate, out_rate, max_denominator = 1000):
+    """
+    Approximate `out_rate / in_rate` by the reduced fraction `up / down`.
+    """
+
+    assert in_rate > 0 and out_rate > 0, "Sample rates must be positive."
+    ratio = Fraction(out_rate).limit_denominator(max_denominator) / \
+            Fraction(in_rate).limit_denominator(max_denominator)
+    ratio = ratio.limit_denominator(max_denominator)
+    return ratio.numerator, ratio.denominator
+
+def _design_poly_filter(up, down, window):
+    """
+    Design the anti-aliasing filter used by `scipy.signal.resample_poly`.
+
+    return:
+        (h, n_pre_remove): the zero-padded filter and the number of leading
+        output samples to be discarded to compensate the filter delay.
+    """
+
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1. / max_rate, window = window) * up
+
+    # Same padding as resample_poly: put the output samples at the center.
+    n_pre_pad = down - half_len % down
+    n_pre_remove = (half_len + n_pre_pad) // down
+    h = np.concatenate((np.zeros(n_pre_pad), h))
+    return h, n_pre_remove
+
+def _resample_sinc(array, in_rate, out_rate, num_zeros, block_size = 4096):
+    """
+    Band-limited interpolation with a Kaiser-windowed sinc kernel.
+
+    Unlike the polyphase method, the ratio `out_rate / in_rate` can be
+    arbitrary. `array` is a 2-D array with time on the last axis.
+    """
+
+    n_in = array.shape[-1]
+    n_out = int(np.ceil(n_in * float(out_rate) / in_rate))
+    step = float(in_rate) / out_rate
+    cutoff = min(1., float(out_rate) / in_rate)
+
+    # Kernel half width in input samples.
+    width = int(np.ceil(num_zeros / cutoff))
+    offsets = np.arange(-width + 1, width + 1)
+    beta = 8.6
+    padded = np.pad(array, ((0, 0), (width, width)), mode = "constant")
+
+    result = np.empty((array.shape[0], n_out))
+    for start in range(0, n_out, block_size):
+        t = np.arange(start, min(start + block_size, n_out)) * step
+        base = np.floor(t).astype(np.intp)
+        index = base[:, None] + offsets[None, :]
+        distance = t[:, None] - index
+        ratio = np.clip(distance / width, -1., 1.)
+        kernel = cutoff * np.sinc(cutoff * distance) * \
+                 np.i0(beta * np.sqrt(1. - ratio ** 2)) / np.i0(beta)
+        result[:, start:start + len(t)] = np.einsum("cmk,mk->cm", padded[:, index + width], kernel)
+    return result
+
+def resample(array, in_rate, out_rate, method = "poly", axis = -1, window = ("kaiser", 5.0), num_zeros = 16):
+    """
+    Resample `array` from `in_rate` to `out_rate`.
+
+    params:
+        `array`: a numpy array. All channels are resampled in one call.
+        `in_rate`, `out_rate`: input and output sample rates.
+        `method`: 'poly' for polyphase filtering (`scipy.signal.resample_poly`)
+                  with the rational approximation of the rate ratio, or
+                  'sinc' for windowed-sinc interpolation.
+        `axis`: the time axis of `array`.
+        `window`: window of the FIR filter for the 'poly' method.
+        `num_zeros`: number of zero crossings of the sinc kernel for the
+                     'sinc' method on each side.
+
+    return:
+        The resampled array of float.
+    """
+
+    array = np.asarray(array, dtype = np.float64)
+    if in_rate == out_rate:
+        return array.copy()
+
+    if method == "poly":
+        up, down = _get_up_down(in_rate, out_rate)
+        return resample_poly(array, up, down, axis = axis, window = window)
+    elif method == "sinc":
+        moved = np.moveaxis(array, axis, -1)
+        shape = moved.shape
+        result = _resample_sinc(moved.reshape((-1, shape[-1])), in_rate, out_rate, num_zeros)
+        return np.moveaxis(result.reshape(shape[:-1] + result.shape[-1:]), -1, axis)
+    else:
+        raise ValueError("Unknown resampling method: {}".format(method))
+
+
+class StreamingResampler(object):
+    """
+    Polyphase resampler which processes the audio data chunk by chunk.
+
+    The filter state is carried between chunks, so the concatenated output
+    is identical to `resample(whole_data, in_rate, out_rate)`.
+
+    ex:
+        resampler = StreamingResampler(44100, 16000)
+        with WavWriter("out.wav", 16000, 2, 1) as writer:
+            for chunk in wav_audio.iter_chunks(4096):
+                writer.write(resampler.process(chunk))
+            writer.write(resampler.flush())
+    """
+
+    def __init__(self, in_rate, out_rate, window = ("kaiser", 5.0)):
+
+        self.__in_rate = in_rate
+        self.__out_rate = out_rate
+        self.__up, self.__down = _get_up_down(in_rate, out_rate)
+
+        h, self.__n_pre_remove = _design_poly_filter(self.__up, self.__down, window)
+        # Polyphase decomposition: phases[p, j] = h[p + j*up]
+        num_taps = int(np.ceil(len(h) / float(self.__up)))
+        h = np.concatenate((h, np.zeros(num_taps * self.__up - len(h))))
+        self.__phases = h.reshape((num_taps, self.__up)).T
+        self.__num_taps = num_taps
+
+        self.__history = None    # input samples still needed, shape (channels, n)
+        self.__history_start = 0 # absolute index of history[:, 0]
+        self.__num_in = 0        # number of input samples consumed
+        self.__next_out = 0      # absolute index of the next filter output
+        self.__num_emitted = 0   # number of output samples returned
+        self.__template = None   # the last processed audio data
+
+    @property
+    def in_rate(self):
+        return self.__in_rate
+
+    @property
+    def out_rate(self):
+        return self.__out_rate
+
+    def __filter(self, stop):
+        """
+        Compute filter outputs up to index `stop` (exclusive) from the history.
+        """
+
+        up, down = self.__up, self.__down
+        m = np.arange(self.__next_out, stop)
+        base = m * down // up
+        phase = m * down - base * up
+        index = base[:, None] - np.arange(self.__num_taps)[None, :] - self.__history_start
+
+        # Indices before the first input sample refer to zeros.
+        valid = index >= 0
+        samples = self.__history[:, np.where(valid, index, 0)] * valid
+        output = np.einsum("cmk,mk->cm", samples, self.__phases[phase])
+        self.__next_out = stop
+
+        # Drop the outputs before the delay of the filter is compensated.
+        num_drop = max(0, min(self.__n_pre_remove - m[0], len(m))) if len(m) else 0
+        return output[:, num_drop:]
+
+    def __feed(self, array, num_out = None):
+
+        if self.__history is None:
+            self.__history = np.zeros((array.shape[0], 0))
+        self.__history = np.concatenate((self.__history, array), axis = 1)
+        self.__num_in += array.shape[1]
+
+        # Output m is available once input m*down//up has been consumed.
+        stop = -(-self.__num_in * self.__up // self.__down)
+        if num_out is not None:
+            stop = min(stop, num_out)
+        output = self.__filter(max(stop, self.__next_out))
+
+        # Keep only the input samples needed by the upcoming outputs.
+        keep_from = self.__next_out * self.__down // self.__up - self.__num_taps + 1
+        keep_from = max(keep_from, self.__history_start)
+        self.__history = self.__history[:, keep_from - self.__history_start:]
+        self.__history_start = keep_from
+
+        self.__num_emitted += output.shape[1]
+        return output
+
+    def __to_audio_data(self, output):
+
+        template = self.__template
+        if template.CHANNELS == 1:
+            output = output[0]
+        return template._spawn(template._encode(output), sample_rate = self.out_rate)
+
+    def process(self, audio_data):
+        """
+        Resample the next chunk of audio data.
+
+        return:
+            An audio data of `out_rate`. It may be shorter than expected since
+            the filter delay is compensated. The rest comes with `flush`.
+        """
+
+        if audio_data.SAMPLE_RATE != self.in_rate:
+            raise ValueError("The sample rate of `audio_data` should be {}.".format(self.in_rate))
+        self.__template = audio_data
+
+        array = np.atleast_2d(audio_data.data).astype(np.float64)
+        return self.__to_audio_data(self.__feed(array))
+
+    def flush(self):
+        """
+        Return the remaining samples once all chunks have been processed.
+        """
+
+        if self.__template is None:
+            return None
+
+        num_out = -(-self.__num_in * self.__up // self.__down)
+        stop = self.__n_pre_remove + num_out
+        num_zeros = (stop - 1) * self.__down // self.__up + 1 - self.__num_in
+        zeros = np.zeros((self.__history.shape[0], max(num_zeros, 0)))
+        output = self.__feed(zeros, num_out = stop)
+
+        # Trim the samples produced by the trailing zeros.
+        excess = self.__num_emitted - num_out
+        if excess > 0:
+            output = output[:, :output.shape[1] - excess]
+        return self.__to_audio_data(output)
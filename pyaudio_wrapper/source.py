@@ -6,6 +6,7 @@ __all__ = ["Microphone", "AudioSource"]
 
 ## Import standard libraries.
 from functools import wraps
+import asyncio
 import os, sys
 
 ## Import necessary third party packages.
@@ -15,6 +16,9 @@ import pyaudio
 ## Import submodules.
 from ._source_abc import AudioSourceABC
 from ._utils import _under_audio_context
+from ._ring_buffer import RingBuffer
+from .devices import acquire_audio, release_audio, get_device_count, get_device_info, \
+                     get_default_input_device_info
 from .audio_data import AudioData, WavAudioData
 from .exceptions import DeviceTypeError
 
@@ -22,16 +26,31 @@ if sys.version_info >= (3, ):
     long = int
 
 class AudioSource(AudioSourceABC):
+    """
+    An audio input device.
+
+    By default the data is read from the device by blocking reads. With
+    `callback = True`, PortAudio delivers the data from its own thread into a
+    ring buffer of `buffer_chunks` chunks, and `read` copies it out. The
+    capture then keeps pace with the device however slow the consumer is,
+    until the ring buffer is full (see `overflow_count`).
+
+    The source can also be used from asyncio, in which case it always runs
+    in callback mode and the callback wakes up the event loop:
+
+        async with Microphone() as source:
+            async for chunk in source.stream():
+                ...
+    """
 
     ## Reimplement all required abstract methods
-    def __init__(self, device_index, sample_rate, bit_width, chunk_size = 8092, channels = 1):
+    def __init__(self, device_index, sample_rate, bit_width, chunk_size = 8092, channels = 1,
+                 callback = False, buffer_chunks = 32):
 
-        audio = pyaudio.PyAudio()
         ## Checking the device_index is valid or not.
         assert isinstance(device_index, (int, long)), "Device index must be an integer."
-        device_count = audio.get_device_count()
-        assert 0 <= device_index < device_count, "`device_index` out of range: {} out of {}".format(device_index, count)
-        audio.terminate()
+        device_count = get_device_count()
+        assert 0 <= device_index < device_count, "`device_index` out of range: {} out of {}".format(device_index, device_count)
         self.__device_index = device_index
 
         if not self.device_info["maxInputChannels"] > 0:
@@ -52,9 +71,18 @@ class AudioSource(AudioSourceABC):
         assert channels in [1, 2], '`channels` can be either 1 or 2. 1 for mono audio, 2 for stereo.' 
         self.__channels = channels
 
+        assert isinstance(buffer_chunks, (int, long)) and buffer_chunks > 0, "`buffer_chunks` must be positive integer."
+        self.__callback = callback
+        self.__sync_callback = callback
+        self.__buffer_chunks = buffer_chunks
+
         # audio resource and streams.
         self.__audio = None
         self.__input_stream = None
+        self.__ring_buffer = None
+        self.__input_overflow_count = 0
+        self.__loop = None
+        self.__data_event = None
 
     @property
     def device_index(self):
@@ -63,10 +91,7 @@ class AudioSource(AudioSourceABC):
 
     @property
     def device_info(self):
-        audio = pyaudio.PyAudio()
-        info = audio.get_device_info_by_index(self.device_index)
-        audio.terminate()
-        return info
+        return get_device_info(self.device_index)
 
     def __enter__(self):
         self.start()
@@ -75,9 +100,36 @@ class AudioSource(AudioSourceABC):
     def __exit__(self, exc_type, exc_value, traceback):
         self.close()
 
+    async def __aenter__(self):
+        assert self.audio is None, "This audio source is already inside a context manager."
+        loop = asyncio.get_running_loop()
+        self.__loop = loop
+        self.__data_event = asyncio.Event()
+        # Asynchronous reads need callback mode, only inside this context.
+        self.__sync_callback, self.__callback = self.__callback, True
+        try:
+            # Opening PortAudio and the stream may take hundreds of
+            # milliseconds, which must not block the other coroutines.
+            await loop.run_in_executor(None, self.start)
+        except BaseException:
+            self.__loop = None
+            self.__callback = self.__sync_callback
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        try:
+            await self.__loop.run_in_executor(None, self.close)
+        finally:
+            self.__loop = None
+            self.__callback = self.__sync_callback
+
     def start(self):
         assert self.audio is None, "This audio source is already inside a context manager."
-        self.audio = pyaudio.PyAudio()
+        self.audio = acquire_audio()
+        if self.callback:
+            self.__ring_buffer = RingBuffer(self.__buffer_chunks * self.CHUNK_SIZE * self.FRAME_WIDTH)
+            self.__input_overflow_count = 0
         self.input_stream.start_stream()
 
     @_under_audio_context
@@ -87,18 +139,202 @@ class AudioSource(AudioSourceABC):
         self.input_stream.close()
         self.input_stream = None
 
-        self.audio.terminate()
         self.audio = None
+        release_audio()
 
     @_under_audio_context
     def read(self, chunk_size = None):
 
         if chunk_size is None:
-            data = bytes(self.input_stream.read(self.CHUNK_SIZE))
+            chunk_size = self.CHUNK_SIZE
         else:
             assert isinstance(chunk_size, int), "`chunk_size` must be integer."
-            data = bytes(self.input_stream.read(chunk_size))
-        return data
+
+        if not self.callback:
+            return bytes(self.input_stream.read(chunk_size))
+
+        pieces = []
+        remaining = chunk_size * self.FRAME_WIDTH
+        while remaining:
+            while not self.__ring_buffer.wait(self.__get_wait_size(remaining), timeout = 1.):
+                self.__check_active()
+            pieces.append(self.__ring_buffer.read(remaining))
+            remaining -= len(pieces[-1])
+        return self.__join(pieces)
+
+    @_under_audio_context
+    def readinto(self, buffer):
+        """
+        Read as many frames as the writable `buffer` can hold into it,
+        without allocating intermediate bytes in callback mode.
+
+        return:
+            The number of frames read.
+        """
+
+        buffer = memoryview(buffer).cast("B")
+        num_frames = len(buffer) // self.FRAME_WIDTH
+        nbytes = num_frames * self.FRAME_WIDTH
+
+        if not self.callback:
+            buffer[:nbytes] = self.input_stream.read(num_frames)
+        else:
+            self.__read_ring(buffer[:nbytes])
+        return num_frames
+
+    def __get_wait_size(self, nbytes):
+        """
+        Number of bytes to wait for before reading `nbytes` bytes as bytes.
+        Up to half of the ring buffer is read at once, so that the result is
+        copied only once; the other half is left for the callback.
+        """
+
+        return min(nbytes, max(self.__ring_buffer.capacity // 2, self.CHUNK_SIZE * self.FRAME_WIDTH))
+
+    @staticmethod
+    def __join(pieces):
+
+        return pieces[0] if len(pieces) == 1 else b"".join(pieces)
+
+    def __read_ring(self, buffer):
+        """
+        Fill `buffer` from the ring buffer. A buffer larger than the ring
+        buffer is filled piece by piece as the data comes.
+        """
+
+        ring_buffer = self.__ring_buffer
+        chunk_bytes = self.CHUNK_SIZE * self.FRAME_WIDTH
+        filled = 0
+        while filled < len(buffer):
+            while not ring_buffer.wait(min(len(buffer) - filled, chunk_bytes), timeout = 1.):
+                self.__check_active()
+            filled += ring_buffer.readinto(buffer[filled:])
+
+    @_under_audio_context
+    async def read_async(self, chunk_size = None):
+        """
+        Read a chunk without blocking the event loop. The source must be
+        used with `async with`.
+        """
+
+        if chunk_size is None:
+            chunk_size = self.CHUNK_SIZE
+        else:
+            assert isinstance(chunk_size, int), "`chunk_size` must be integer."
+
+        pieces = []
+        remaining = chunk_size * self.FRAME_WIDTH
+        while remaining:
+            await self.__wait_async(self.__get_wait_size(remaining))
+            pieces.append(self.__ring_buffer.read(remaining))
+            remaining -= len(pieces[-1])
+        return self.__join(pieces)
+
+    @_under_audio_context
+    async def readinto_async(self, buffer):
+        """
+        Same as `readinto` without blocking the event loop. The source must
+        be used with `async with`.
+        """
+
+        buffer = memoryview(buffer).cast("B")
+        num_frames = len(buffer) // self.FRAME_WIDTH
+        nbytes = num_frames * self.FRAME_WIDTH
+
+        await self.__read_ring_async(buffer[:nbytes])
+        return num_frames
+
+    async def __read_ring_async(self, buffer):
+        """
+        Same as `__read_ring` without blocking the event loop.
+        """
+
+        chunk_bytes = self.CHUNK_SIZE * self.FRAME_WIDTH
+        filled = 0
+        while filled < len(buffer):
+            await self.__wait_async(min(len(buffer) - filled, chunk_bytes))
+            filled += self.__ring_buffer.readinto(buffer[filled:])
+
+    async def __wait_async(self, nbytes):
+        """
+        Wait until `nbytes` bytes are available in the ring buffer.
+        """
+
+        if self.__loop is None:
+            raise RuntimeError("Asynchronous reads can only be used inside `async with`.")
+
+        while self.__ring_buffer.available < nbytes:
+            self.__data_event.clear()
+            # Data may have been written before the event was cleared.
+            if self.__ring_buffer.available >= nbytes:
+                break
+            try:
+                await asyncio.wait_for(self.__data_event.wait(), 1.)
+            except asyncio.TimeoutError:
+                self.__check_active()
+
+    async def stream(self, chunk_size = None):
+        """
+        Asynchronous iterator over the chunks read from the source.
+
+        ex:
+            async for chunk in source.stream():
+                ...
+        """
+
+        while True:
+            yield await self.read_async(chunk_size)
+
+    def __check_active(self):
+
+        if not self.input_stream.is_active():
+            raise IOError("The input stream is not active.")
+
+    def __on_input_data(self, in_data, frame_count, time_info, status_flags):
+        """
+        The stream callback, called by PortAudio from its own thread.
+        """
+
+        if status_flags & pyaudio.paInputOverflow:
+            self.__input_overflow_count += 1
+        self.__ring_buffer.write(in_data)
+
+        # Wake up the coroutines waiting in `read_async`.
+        loop = self.__loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self.__data_event.set)
+        return (None, pyaudio.paContinue)
+
+    @property
+    def callback(self):
+        """
+        Whether the data is delivered by the stream callback into a ring buffer.
+        """
+        return self.__callback
+
+    @property
+    def overflow_count(self):
+        """
+        Number of callbacks whose data did not fit in the ring buffer since
+        the source started.
+        """
+        return self.__ring_buffer.overflow_count if self.__ring_buffer is not None else 0
+
+    @property
+    def dropped_frames(self):
+        """
+        Number of frames dropped because the ring buffer was full.
+        """
+        if self.__ring_buffer is None:
+            return 0
+        return self.__ring_buffer.dropped_bytes // self.FRAME_WIDTH
+
+    @property
+    def input_overflow_count(self):
+        """
+        Number of input overflows reported by PortAudio in callback mode.
+        """
+        return self.__input_overflow_count
 
     @property
     def audio(self):
@@ -144,6 +380,13 @@ class AudioSource(AudioSourceABC):
     def CHUNK_SIZE(self, value):
         raise RuntimeError("It is not allowd to modifyt the `CHUNK_SIZE`.")
         
+    @property
+    def FRAME_WIDTH(self):
+        """
+        Size of a frame in bytes.
+        """
+        return self.BIT_WIDTH * self.CHANNELS
+
     @property
     def FORMAT(self):
         return self.__format
@@ -167,7 +410,8 @@ class AudioSource(AudioSourceABC):
                 channels = self.CHANNELS,
                 frames_per_buffer = self.CHUNK_SIZE,
                 input = True,
-                start = False)
+                start = False,
+                stream_callback = self.__on_input_data if self.callback else None)
             return self.__input_stream
 
     @input_stream.setter
@@ -181,11 +425,9 @@ class AudioSource(AudioSourceABC):
 class Microphone(AudioSource):
 
     
-    def __init__(self, bit_width = 2, chunk_size = 8092, channels = 1):
+    def __init__(self, bit_width = 2, chunk_size = 8092, channels = 1, callback = False, buffer_chunks = 32):
         
-        audio = pyaudio.PyAudio()
-        info = audio.get_default_input_device_info()
-        audio.terminate()
+        info = get_default_input_device_info()
         
         device_index = int(info["index"])
         sample_rate = int(info["defaultSampleRate"])
@@ -194,4 +436,6 @@ class Microphone(AudioSource):
                                          sample_rate = sample_rate,
                                          bit_width = bit_width,
                                          chunk_size = chunk_size,
-                                         channels = channels)
+                                         channels = channels,
+                                         callback = callback,
+                                         buffer_chunks = buffer_chunks)
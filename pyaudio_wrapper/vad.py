@@ -0,0 +1,87 @@
+"""
+The `vad` submodule: offline voice activity detection and silence splitting.
+
+The energy of every frame of the audio data is computed in one vectorized
+pass, so long recordings can be cut into utterances quickly.
+
+ex:
+    audio = WavFileAudioData("long_recording.wav", use_mmap = True)
+    for utterance in split_on_silence(audio, min_silence_ms = 500):
+        utterance.play()
+"""
+
+__all__ = ["detect_voice_segments", "split_on_silence"]
+
+import numpy as np
+
+from . import dsp
+
+def _merge_runs(starts, stops, min_gap):
+    """
+    Merge the consecutive runs `[starts[i], stops[i])` separated by less
+    than `min_gap`.
+    """
+
+    if len(starts) == 0:
+        return starts, stops
+    keep = starts[1:] - stops[:-1] >= min_gap
+    return starts[np.r_[True, keep]], stops[np.r_[keep, True]]
+
+def detect_voice_segments(audio_data, threshold = None, frame_ms = 20, min_silence_ms = 300,
+                          min_voice_ms = 0, padding_ms = 0):
+    """
+    Find the segments of the audio data with sound.
+
+    params:
+        `audio_data`: an AudioData instance.
+        `threshold`: rms threshold of the frames with sound. Default is twice
+                     the noise floor, estimated as the 10th percentile of the
+                     frame rms.
+        `frame_ms`: frame size in millisecond.
+        `min_silence_ms`: silences shorter than this do not split segments.
+        `min_voice_ms`: segments shorter than this are dropped.
+        `padding_ms`: silence kept before and after each segment.
+
+    return:
+        An array of shape (num_segments, 2) with the first and the last
+        (exclusive) frame index of each segment.
+    """
+
+    ms_to_frames = audio_data.SAMPLE_RATE / 1000.
+    frame_length = max(1, int(round(frame_ms * ms_to_frames)))
+    energy = dsp.frame_rms(audio_data.data, frame_length)
+    if threshold is None:
+        threshold = dsp.default_threshold(energy)
+
+    # Runs of voiced frames, in frames of `frame_length`.
+    edges = np.diff(np.r_[0, (energy > threshold).view(np.int8), 0])
+    starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    starts, stops = _merge_runs(starts, stops, min_silence_ms * ms_to_frames / frame_length)
+
+    long_enough = (stops - starts) * frame_length >= min_voice_ms * ms_to_frames
+    starts, stops = starts[long_enough] * frame_length, stops[long_enough] * frame_length
+
+    padding = int(round(padding_ms * ms_to_frames))
+    num_frames = len(audio_data)
+    starts = np.maximum(starts - padding, 0)
+    stops = np.minimum(stops + padding, num_frames)
+    starts, stops = _merge_runs(starts, stops, 0)
+    return np.stack((starts, stops), axis = -1).astype(np.intp)
+
+def split_on_silence(audio_data, min_silence_ms = 300, threshold = None, **kwargs):
+    """
+    Split the audio data on the silences longer than `min_silence_ms`.
+
+    params:
+        `audio_data`: an AudioData instance.
+        `min_silence_ms`, `threshold`, `kwargs`: see `detect_voice_segments`.
+
+    return:
+        A generator of the segments with sound. Each segment is a view
+        sharing the buffer of `audio_data`, no data is copied.
+    """
+
+    segments = detect_voice_segments(audio_data, threshold = threshold,
+                                     min_silence_ms = min_silence_ms, **kwargs)
+    for start, stop in segments:
+        yield audio_data._frame_slice(start, stop)
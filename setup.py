@@ -182,9 +182,9 @@ if __name__ == "__main__":
         url = "https://github.com/dboyliao/pyaudio_wrapper",
         packages = find_packages(exclude = ['tests']),
         install_requires = ["pyaudio",
-                            "numpy",
-                            "scipy",
-                            "matplotlib"],
+                            "numpy>=1.12.0",
+                            "scipy>=1.4.0",
+                            "matplotlib>=3.5.0"],
         cmdclass = {'uninstall': uninstall_cmd,
                     'install': install_cmd,
                     'develop': develop_cmd}
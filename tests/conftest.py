@@ -0,0 +1,3 @@
+# The scripts below are manual tests: they need an audio device, the sample
+# files of `tests/data` relative to the working directory, or a display.
+collect_ignore = ["test_audio_data.py", "test_plots.py", "test_record_plot.py"]
@@ -0,0 +1,74 @@
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from pyaudio_wrapper.audio_data import AudioData
+from pyaudio_wrapper.analyse import AudioAnalysor
+
+def make_audio_data(num_frames, channels = 1, sample_rate = 16000):
+    samples = np.random.RandomState(0).randint(-8000, 8000, (num_frames, channels)).astype(np.int16)
+    return AudioData(samples.tobytes(), sample_rate, 2, channels)
+
+@pytest.fixture(autouse = True)
+def close_figures():
+    yield
+    plt.close("all")
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("by_sec", [True, False])
+def test_plot(channels, by_sec):
+    analysor = AudioAnalysor(make_audio_data(200000, channels))
+    analysor.plot(by_sec = by_sec, num_buckets = 500)
+    fig = plt.gcf()
+    fig.canvas.draw()
+
+    axs = fig.axes
+    assert len(axs) == channels + 1
+    for ax in axs[:-1]:
+        line = ax.get_lines()[0]
+        # The whole signal is drawn as a decimated envelope.
+        assert 0 < len(line.get_xdata()) <= 4 * 500
+
+    # Zooming in re-decimates the visible range.
+    scale = 1. / 16000 if by_sec else 1.
+    axs[0].set_xlim(1000 * scale, 1200 * scale)
+    line = axs[0].get_lines()[0]
+    assert len(line.get_xdata()) <= 202
+
+def test_plot_spectrum():
+    analysor = AudioAnalysor(make_audio_data(4000, 2))
+    analysor.plot_spectrum()
+    plt.gcf().canvas.draw()
+    assert len(plt.gcf().axes) == 3
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_denoise_empty(channels):
+    analysor = AudioAnalysor(AudioData(b"", 16000, 2, channels))
+    assert analysor.denoise("freq").num_frames == 0
+
+def test_denoise_by_energy():
+    rng = np.random.RandomState(1)
+    samples = rng.randint(-100, 100, (16000, 2))
+    samples[4000:8000] *= 50
+    audio_data = AudioData(samples.astype(np.int16).tobytes(), 16000, 2, 2)
+    analysor = AudioAnalysor(audio_data)
+    denoised = analysor.denoise("energy", frame_ms = 25, fade_ms = 0)
+    assert analysor.audio_data is denoised
+    np.testing.assert_array_equal(denoised.data[:, 4000:8000], audio_data.data[:, 4000:8000])
+    assert not denoised.data[:, :4000].any() and not denoised.data[:, 8000:].any()
+
+def test_denoise_unknown_method():
+    with pytest.raises(ValueError):
+        AudioAnalysor(AudioData(b"", 16000, 2, 1)).denoise("median")
+
+def test_stft_cached():
+    analysor = AudioAnalysor(make_audio_data(16000, 2))
+    magnitude, phase = analysor.stft(frame_ms = 25, hop_ms = 10)
+    assert magnitude.shape == phase.shape == (2, 99, 257)
+
+    # The same parameters hit the cache.
+    assert analysor.stft(frame_ms = 25, hop_ms = 10)[0] is magnitude
+    assert analysor.stft(frame_ms = 20, hop_ms = 10)[0] is not magnitude
+    assert analysor.stft(frame_ms = 25, hop_ms = 10, window = "hamming")[0] is not magnitude
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from pyaudio_wrapper.audio_data import AudioData, WavAudioData
+
+RATE = 16000
+
+def make_audio_data(num_frames, channels = 1, seed = 0, cls = AudioData):
+    samples = np.random.RandomState(seed).randint(-8000, 8000, (num_frames, channels)).astype(np.int16)
+    return cls(samples.tobytes(), RATE, 2, channels)
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_data_is_a_cached_read_only_view(channels):
+    audio_data = make_audio_data(1000, channels)
+    data = audio_data.data
+    assert audio_data.data is data
+    assert not data.flags.writeable
+    assert data.shape == ((1000,) if channels == 1 else (2, 1000))
+    assert np.shares_memory(data, np.frombuffer(audio_data.BYTE_DATA, dtype = np.uint8))
+    np.testing.assert_array_equal(data.T.ravel(), np.frombuffer(audio_data.BYTE_DATA, dtype = np.int16))
+
+def test_derived_audio_data_have_their_own_cache():
+    audio_data = make_audio_data(1000, 2)
+    data = audio_data.data
+    spawned = audio_data._spawn(bytes(audio_data.BYTE_DATA[:400]))
+    assert spawned.data is not data
+    np.testing.assert_array_equal(spawned.data, data[:, :100])
+
+    resampled = audio_data.convert_sample_rate(8000)
+    assert resampled.SAMPLE_RATE == 8000 and resampled.num_frames == 500
+    assert not np.shares_memory(resampled.data, data)
+
+def test_num_frames_and_num_bytes():
+    audio_data = make_audio_data(1000, 2)
+    assert audio_data.num_bytes == 4000
+    assert audio_data.num_frames == len(audio_data) == 1000
+    assert audio_data.duration == 62
+    # The metadata does not decode the samples.
+    assert audio_data._AudioData__data is None
+
+    lazy = AudioData([b"\x00" * 400, b"\x00" * 800], RATE, 2, 1)
+    assert lazy.num_bytes == 1200 and lazy.num_frames == 600
+    # Nor join the segments.
+    assert len(lazy._AudioData__segments) == 2
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_slices_share_memory(channels):
+    audio_data = make_audio_data(16000, channels)
+    piece = audio_data[250:500]
+    assert isinstance(piece.BYTE_DATA, memoryview)
+    assert piece.num_frames == 4000
+    assert np.shares_memory(piece.data, audio_data.data)
+    np.testing.assert_array_equal(piece.data, audio_data.data[..., 4000:8000])
+
+    # Slices of slices still share the original buffer.
+    sub = piece[0:100]
+    assert np.shares_memory(sub.data, audio_data.data)
+    np.testing.assert_array_equal(sub.data, audio_data.data[..., 4000:5600])
+
+def test_slice_bounds():
+    audio_data = make_audio_data(16000)
+    assert audio_data[:].num_frames == 16000
+    assert audio_data[500:].num_frames == 8000
+    assert audio_data[500:2000].num_frames == 8000
+    assert audio_data[800:200].num_frames == 0
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_stepped_slices_are_copies(channels):
+    audio_data = make_audio_data(1000, channels)
+    piece = audio_data[::3]
+    assert not np.shares_memory(piece.data, audio_data.data)
+    np.testing.assert_array_equal(piece.data, audio_data.data[..., ::3])
+
+def test_add_is_lazy():
+    first, second = make_audio_data(100, seed = 1), make_audio_data(200, seed = 2)
+    total = first + second + first
+    assert total.num_frames == 400
+    assert len(total._AudioData__segments) == 3
+    assert total.BYTE_DATA == b"".join([first.BYTE_DATA, second.BYTE_DATA, first.BYTE_DATA])
+    assert len(total._AudioData__segments) == 1
+
+def test_concat():
+    pieces = [make_audio_data(100, 2, seed = seed, cls = WavAudioData) for seed in range(5)]
+    total = WavAudioData.concat(pieces)
+    assert type(total) is WavAudioData
+    assert total.BYTE_DATA == b"".join(piece.BYTE_DATA for piece in pieces)
+    assert AudioData.concat(iter(pieces)).BYTE_DATA == total.BYTE_DATA
+
+def test_concat_errors():
+    with pytest.raises(ValueError):
+        AudioData.concat([])
+    with pytest.raises(ValueError):
+        make_audio_data(10) + make_audio_data(10, 2)
+    with pytest.raises(ValueError):
+        AudioData.concat([make_audio_data(10), AudioData(b"\x00" * 20, 8000, 2, 1)])
+    with pytest.raises(ValueError):
+        WavAudioData.concat([make_audio_data(10)])
@@ -0,0 +1,53 @@
+import tracemalloc
+
+from pyaudio_wrapper._capture_buffer import CaptureBuffer
+
+def fill(region, value):
+    region[:] = bytes([value]) * len(region)
+
+def test_reserve_commit_finish():
+    capture = CaptureBuffer(2, 4)
+    fill(capture.reserve(3), 1)
+    capture.commit()
+    fill(capture.reserve(3), 2)
+    # An uncommitted region is reused by the next reservation.
+    fill(capture.reserve(10), 3)
+    capture.commit()
+    assert capture.num_frames == 13
+    result = capture.finish()
+    assert isinstance(result, bytearray)
+    assert result == b"\x01" * 6 + b"\x03" * 20
+
+def test_partial_commit():
+    capture = CaptureBuffer(2, 4)
+    fill(capture.reserve(4), 1)
+    capture.commit(3)
+    assert capture.num_frames == 1
+    fill(capture.reserve(1), 2)
+    capture.commit(100)
+    assert capture.finish() == b"\x01\x01\x02\x02"
+
+def test_max_frames():
+    capture = CaptureBuffer(2, 4, max_frames = 10)
+    assert len(capture.reserve(6)) == 12
+    capture.commit()
+    assert not capture.full
+    assert len(capture.reserve(6)) == 8
+    capture.commit()
+    assert capture.full
+    assert len(capture.reserve(6)) == 0
+    assert len(capture.finish()) == 20
+
+def test_memory_grows_with_the_recording():
+    tracemalloc.start()
+    try:
+        capture = CaptureBuffer(4, 44100, max_frames = 44100 * 3600)
+        assert tracemalloc.get_traced_memory()[0] < 1024 ** 2
+        for _ in range(10):
+            capture.reserve(44100)
+            capture.commit()
+        # 10 seconds: the capacity is at most 1.5 times the recording.
+        assert tracemalloc.get_traced_memory()[0] < 1.6 * 10 * 44100 * 4 + 1024 ** 2
+    finally:
+        tracemalloc.stop()
+    assert len(capture.finish()) == 10 * 44100 * 4
@@ -0,0 +1,123 @@
+import pytest
+
+from pyaudio_wrapper import devices, playback
+
+class FakeAudio(object):
+
+    instances = []
+    num_devices = 2 # number of devices seen by new instances
+
+    def __init__(self):
+        self.terminated = False
+        self.num_devices = FakeAudio.num_devices
+        FakeAudio.instances.append(self)
+
+    def terminate(self):
+        self.terminated = True
+
+    def get_device_count(self):
+        return self.num_devices
+
+    def get_device_info_by_index(self, index):
+        return {"index": index, "name": "device %d" % index}
+
+    def get_default_input_device_info(self):
+        return self.get_device_info_by_index(0)
+
+    def get_default_output_device_info(self):
+        raise IOError("No Default Output Device Available")
+
+class FakeEngine(object):
+
+    def __init__(self, playing):
+        self.playing = playing
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse = True)
+def fake_audio(monkeypatch):
+    FakeAudio.instances = []
+    FakeAudio.num_devices = 2
+    monkeypatch.setattr(devices.pyaudio, "PyAudio", FakeAudio)
+    monkeypatch.setattr(devices, "_audio", None)
+    monkeypatch.setattr(devices, "_ref_count", 0)
+    monkeypatch.setattr(devices, "_device_table", None)
+
+def test_audio_kept_alive():
+    for _ in range(5):
+        with devices.audio_context() as audio:
+            assert not audio.terminated
+    audio = devices.acquire_audio()
+    assert devices.acquire_audio() is audio
+    devices.release_audio()
+    devices.release_audio()
+    assert len(FakeAudio.instances) == 1
+    assert not audio.terminated
+
+    with pytest.raises(AssertionError):
+        devices.release_audio()
+
+def test_shutdown():
+    audio = devices.acquire_audio()
+    # The instance is in use.
+    assert not devices.shutdown()
+    assert not audio.terminated
+    devices.release_audio()
+
+    assert devices.shutdown()
+    assert audio.terminated
+    assert devices.shutdown()
+
+    with devices.audio_context() as new_audio:
+        assert new_audio is not audio
+    assert len(FakeAudio.instances) == 2
+
+def test_device_table_cached():
+    assert devices.get_device_count() == 2
+    assert devices.get_device_info(1)["name"] == "device 1"
+    assert devices.get_default_input_device_info()["index"] == 0
+    with pytest.raises(IOError):
+        devices.get_default_output_device_info()
+    with pytest.raises(IOError):
+        devices.get_device_info(2)
+    assert len(FakeAudio.instances) == 1
+
+def test_refresh_devices():
+    assert devices.get_device_count() == 2
+    FakeAudio.num_devices = 3
+    # The table is not read again.
+    assert devices.get_device_count() == 2
+
+    # PortAudio is initialised again to see the new device.
+    assert len(devices.refresh_devices()) == 3
+    assert devices.get_device_count() == 3
+    assert len(FakeAudio.instances) == 2
+    assert FakeAudio.instances[0].terminated
+    assert not FakeAudio.instances[1].terminated
+    with devices.audio_context() as audio:
+        assert audio is FakeAudio.instances[1]
+    assert len(FakeAudio.instances) == 2
+
+def test_refresh_devices_in_use():
+    devices.get_device_count()
+    with devices.audio_context() as audio:
+        with pytest.raises(RuntimeError):
+            devices.refresh_devices()
+        assert not audio.terminated
+    assert len(FakeAudio.instances) == 1
+
+def test_refresh_devices_while_playing(monkeypatch):
+    monkeypatch.setattr(playback, "_engines", {})
+    playback._engines["idle"] = idle_engine = FakeEngine(playing = False)
+    playback._engines["playing"] = playing_engine = FakeEngine(playing = True)
+    with pytest.raises(RuntimeError):
+        devices.refresh_devices()
+    # Nothing is stopped.
+    assert not idle_engine.closed and not playing_engine.closed
+
+    playing_engine.playing = False
+    devices.refresh_devices()
+    assert idle_engine.closed and playing_engine.closed
+    assert playback._engines == {}
@@ -0,0 +1,209 @@
+import numpy as np
+import pytest
+
+from pyaudio_wrapper import dsp
+
+def test_to_samples_bytes():
+    samples = np.array([0, 1, -1, 32767, -32768], dtype = np.int16)
+    result = dsp.to_samples(samples.tobytes(), 2)
+    assert result.dtype == np.int16
+    np.testing.assert_array_equal(result, samples)
+
+def test_to_samples_24_bits():
+    values = np.array([0, 1, -1, 2 ** 23 - 1, -2 ** 23])
+    raw = b"".join(int(v).to_bytes(3, "little", signed = True) for v in values)
+    np.testing.assert_array_equal(dsp.to_samples(raw, 3), values)
+
+def test_to_samples_requires_bit_width():
+    with pytest.raises(AssertionError):
+        dsp.to_samples(b"\x00\x00")
+
+def test_saturate():
+    result = dsp.saturate(np.array([-40000., -1.6, 0.4, 40000.]), np.int16)
+    assert result.dtype == np.int16
+    np.testing.assert_array_equal(result, [-32768, -2, 0, 32767])
+
+def test_gain_saturates():
+    samples = np.array([100, -100, 20000, -20000], dtype = np.int16)
+    np.testing.assert_array_equal(dsp.gain(samples, 2.), [200, -200, 32767, -32768])
+
+def test_gain_unsigned():
+    samples = np.array([128, 129, 127, 255], dtype = np.uint8)
+    np.testing.assert_array_equal(dsp.gain(samples, 2.), [128, 130, 126, 255])
+
+def test_rms_and_peak():
+    samples = np.array([3, -4, 3, -4], dtype = np.int16)
+    assert dsp.rms(samples) == pytest.approx(np.sqrt(12.5))
+    assert dsp.rms(samples.tobytes(), 2) == pytest.approx(np.sqrt(12.5))
+    assert dsp.peak(samples) == 4
+    assert dsp.rms(b"", 2) == 0.
+    assert dsp.peak(b"", 2) == 0
+
+def test_rms_per_channel():
+    samples = np.array([[1, -1, 1, -1], [2, 2, -2, -2]], dtype = np.int16)
+    np.testing.assert_allclose(dsp.rms(samples, axis = -1), [1., 2.])
+
+def test_rms_unsigned():
+    samples = np.array([128, 130, 126], dtype = np.uint8)
+    assert dsp.rms(samples) == pytest.approx(np.sqrt(8. / 3))
+    assert dsp.dc_offset(samples) == pytest.approx(0.)
+
+def test_zero_crossing_rate():
+    samples = np.array([1, -1, 1, -1, -1], dtype = np.int16)
+    assert dsp.zero_crossing_rate(samples) == pytest.approx(3. / 4)
+    assert dsp.zero_crossing_rate(samples[:1]) == 0.
+
+def test_frame_signal():
+    frames = dsp.frame_signal(np.arange(10), 4, 3)
+    np.testing.assert_array_equal(frames, [[0, 1, 2, 3], [3, 4, 5, 6], [6, 7, 8, 9]])
+    assert not frames.flags.writeable
+    assert dsp.frame_signal(np.arange(3), 4, 1).shape == (0, 4)
+
+def test_frame_rms_partial_frame():
+    samples = np.array([3, 3, 4, 4, 5], dtype = np.int16)
+    np.testing.assert_allclose(dsp.frame_rms(samples, 2), [3., 4., 5.])
+    assert len(dsp.frame_rms(samples[:0], 2)) == 0
+
+def test_frame_rms_interleaved_bytes():
+    samples = np.array([[1, 1, 2, 2], [3, 3, 4, 4]], dtype = np.int16)
+    raw = samples.T.tobytes()
+    np.testing.assert_allclose(dsp.frame_rms(raw, 2, bit_width = 2, channels = 2),
+                               dsp.frame_rms(samples, 2))
+    np.testing.assert_allclose(dsp.frame_rms(samples, 2), [np.sqrt(5.), np.sqrt(10.)])
+
+def test_spectral_subtract_independent_of_block_size():
+    rng = np.random.RandomState(0)
+    samples = rng.randint(-3000, 3000, (2, 5003)).astype(np.int16)
+    expected = dsp.spectral_subtract(samples, 256, block_size = 10000)
+    assert expected.shape == (5003, 2)
+    for block_size in [1, 2, 3, 7, 64]:
+        np.testing.assert_array_equal(dsp.spectral_subtract(samples, 256, block_size = block_size), expected)
+
+@pytest.mark.parametrize("hop_length", [None, 100, 128])
+def test_spectral_subtract_reconstructs_without_noise(hop_length):
+    samples = np.random.RandomState(1).randint(-3000, 3000, 4000).astype(np.int16)
+    noise = np.zeros(dsp.noise_profile(samples, 256).shape)
+    result = dsp.spectral_subtract(samples, 256, hop_length, noise = noise, floor = 1.)
+    np.testing.assert_array_equal(result, samples)
+
+def test_spectral_subtract_removes_noise():
+    rng = np.random.RandomState(2)
+    noise = rng.normal(0, 500, 32000)
+    tone = 5000 * np.sin(2 * np.pi * 440 * np.arange(32000) / 16000.)
+    tone[:16000] = 0
+    samples = dsp.saturate(noise + tone, np.int16)
+    result = dsp.spectral_subtract(samples, 512).astype(np.float64)
+    # The noise only half is attenuated, the tone is kept.
+    assert dsp.rms(result[:16000]) < 0.5 * dsp.rms(samples[:16000])
+    assert dsp.rms(result[16000:]) > 0.8 * dsp.rms(tone[16000:])
+
+def test_spectral_subtract_empty():
+    samples = np.zeros((2, 0), dtype = np.int16)
+    assert dsp.noise_profile(samples, 256).shape == (2, 129)
+    assert dsp.spectral_subtract(samples, 256).shape == (0, 2)
+    assert dsp.spectral_subtract(samples[0], 256).shape == (0,)
+
+def test_spectral_subtract_rejects_empty_blocks():
+    with pytest.raises(AssertionError):
+        dsp.spectral_subtract(np.zeros(100, dtype = np.int16), 32, block_size = 0)
+
+@pytest.mark.parametrize("block_size", [1, 4, 1024])
+def test_stft_matches_rfft(block_size):
+    from scipy.fft import rfft
+    from scipy.signal import get_window
+
+    samples = np.random.RandomState(0).randint(-8000, 8000, 1040).astype(np.int16)
+    result = dsp.stft(samples, 200, 80, n_fft = 256, block_size = block_size, workers = 2)
+    assert result.shape == (12, 129)
+
+    window = get_window("hann", 200)
+    for index in [0, 5, 10]:
+        frame = samples[index * 80:index * 80 + 200]
+        np.testing.assert_allclose(result[index], rfft(frame * window, 256))
+    # The last frame is zero-padded.
+    frame = np.pad(samples[880:].astype(np.float64), (0, 40), mode = "constant")
+    np.testing.assert_allclose(result[11], rfft(frame * window, 256))
+
+def test_stft_unsigned():
+    samples = np.random.RandomState(0).randint(-100, 100, 1040)
+    result = dsp.stft(samples, 200, 80)
+    # Silence of 8 bits samples is 128, which must not show up as DC.
+    np.testing.assert_allclose(dsp.stft((samples + 128).astype(np.uint8), 200, 80), result)
+    assert np.all(np.abs(dsp.stft(np.full(1040, 128, np.uint8), 200, 80)) == 0)
+
+def test_stft_channels():
+    samples = np.random.RandomState(0).randint(-8000, 8000, (2, 1040)).astype(np.int16)
+    result = dsp.stft(samples, 200, 80)
+    assert result.shape == (2, 12, 129)
+    np.testing.assert_allclose(result[1], dsp.stft(samples[1], 200, 80))
+
+def test_default_threshold():
+    energy = np.r_[np.full(20, 10.), np.full(80, 1000.)]
+    assert dsp.default_threshold(energy) == 20.
+    assert dsp.default_threshold(energy, percentile = 50, factor = 1.5) == 1500.
+    assert dsp.default_threshold(np.empty(0)) == 0.
+
+def make_burst(length = 16000, start = 4000, stop = 8000, seed = 3):
+    """
+    Noise of rms about 58 with a 440 Hz tone burst of amplitude 5000.
+    """
+
+    rng = np.random.RandomState(seed)
+    samples = rng.randint(-100, 100, length).astype(np.float64)
+    t = np.arange(start, stop)
+    samples[start:stop] += 5000 * np.sin(2 * np.pi * 440 * t / 16000.)
+    return dsp.saturate(samples, np.int16)
+
+def test_energy_gate_default_threshold():
+    samples = make_burst()
+    result = dsp.energy_gate(samples, 400)
+    assert result.dtype == np.int16
+    np.testing.assert_array_equal(result[4000:8000], samples[4000:8000])
+    assert not result[:4000].any() and not result[8000:].any()
+
+def test_energy_gate_threshold_and_attenuation():
+    samples = make_burst()
+    # Above the tone: everything is attenuated.
+    result = dsp.energy_gate(samples, 400, threshold = 1e5, attenuation = 0.5)
+    np.testing.assert_array_equal(result, np.round(samples * 0.5).astype(np.int16))
+
+    result = dsp.energy_gate(samples, 400, threshold = 1000, attenuation = 0.25)
+    np.testing.assert_array_equal(result[4000:8000], samples[4000:8000])
+    np.testing.assert_array_equal(result[:4000], np.round(samples[:4000] * 0.25).astype(np.int16))
+
+def test_energy_gate_fades_linearly():
+    samples = np.full(16000, 10, dtype = np.int16)
+    samples[4000:8000] = 1000
+    result = dsp.energy_gate(samples, 400, threshold = 100, fade_length = 100)
+
+    ramp = (np.arange(100) + .5) / 100
+    np.testing.assert_array_equal(result[3950:4050], np.round(samples[3950:4050] * ramp))
+    np.testing.assert_array_equal(result[7950:8050], np.round(samples[7950:8050] * ramp[::-1]))
+    # Outside of the fades, frames are either kept or zeroed.
+    assert not result[:3950].any() and not result[8050:].any()
+    np.testing.assert_array_equal(result[4050:7950], samples[4050:7950])
+
+def test_energy_gate_fade_is_limited_to_a_frame():
+    samples = np.full(4000, 10, dtype = np.int16)
+    samples[2000:] = 1000
+    result = dsp.energy_gate(samples, 40, threshold = 100, fade_length = 1000)
+    assert not result[:1980].any()
+    np.testing.assert_array_equal(result[2020:], samples[2020:])
+
+def test_energy_gate_unsigned():
+    samples = (make_burst() // 256 + 128).astype(np.uint8)
+    result = dsp.energy_gate(samples, 400, threshold = 10)
+    assert result.dtype == np.uint8
+    assert (result[:4000] == 128).all() and (result[8000:] == 128).all()
+    np.testing.assert_array_equal(result[4000:8000], samples[4000:8000])
+
+    result = dsp.energy_gate(samples, 400, threshold = 10, attenuation = 0.5, fade_length = 100)
+    assert np.abs(result[:3900].astype(int) - 128).max() <= 1
+
+def test_energy_gate_channels():
+    samples = np.stack((make_burst(), make_burst(seed = 4) // 100))
+    result = dsp.energy_gate(samples, 400, threshold = 1000)
+    assert result.shape == (16000, 2)
+    # The frames are gated on the rms over all channels.
+    np.testing.assert_array_equal(result[4000:8000], samples[:, 4000:8000].T)
+    assert not result[:4000].any() and not result[8000:].any()
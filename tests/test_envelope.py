@@ -0,0 +1,52 @@
+import numpy as np
+
+from pyaudio_wrapper._envelope import MinMaxPyramid
+
+def brute_force(samples, start, stop, size):
+    chunks = [samples[i:min(i + size, stop)] for i in range(start, stop, size)]
+    return np.array([chunk.min() for chunk in chunks]), np.array([chunk.max() for chunk in chunks])
+
+def test_levels_cover_the_signal():
+    samples = np.random.RandomState(0).randint(-1000, 1000, 100003).astype(np.int16)
+    pyramid = MinMaxPyramid(samples, base_bucket = 64, factor = 4, block_size = 1000)
+    assert len(pyramid) == len(samples)
+
+    index, values = pyramid.envelope(0, len(samples), 1)
+    assert values.min() == samples.min() and values.max() == samples.max()
+
+def test_envelope_matches_brute_force():
+    samples = np.random.RandomState(1).randn(50000)
+    pyramid = MinMaxPyramid(samples, base_bucket = 16, factor = 4)
+    # The bucket size at level 1 is 64: aligned ranges are exact.
+    index, values = pyramid.envelope(640, 640 + 64 * 100, 100)
+    mins, maxs = brute_force(samples, 640, 640 + 64 * 100, 64)
+    np.testing.assert_array_equal(values[0::2], mins)
+    np.testing.assert_array_equal(values[1::2], maxs)
+    assert index.min() >= 640 and index.max() < 640 + 64 * 100
+
+def test_envelope_size_is_bounded():
+    samples = np.random.RandomState(2).randn(1 << 20)
+    pyramid = MinMaxPyramid(samples)
+    for start, stop in [(0, len(samples)), (12345, 901234), (1000, 300000)]:
+        index, values = pyramid.envelope(start, stop, 500)
+        assert len(values) <= 4 * 500
+        assert len(index) == len(values)
+        # Every sample of the range is inside the envelope.
+        assert values.min() <= samples[start:stop].min()
+        assert values.max() >= samples[start:stop].max()
+
+def test_short_range_returns_raw_samples():
+    samples = np.arange(1000)
+    pyramid = MinMaxPyramid(samples, base_bucket = 64)
+    index, values = pyramid.envelope(100, 200, 1000)
+    np.testing.assert_array_equal(index, np.arange(100, 200))
+    np.testing.assert_array_equal(values, samples[100:200])
+
+def test_empty_range_and_signal():
+    pyramid = MinMaxPyramid(np.arange(10))
+    index, values = pyramid.envelope(5, 5, 10)
+    assert len(index) == len(values) == 0
+
+    empty = MinMaxPyramid(np.zeros(0, dtype = np.int16))
+    index, values = empty.envelope(0, 10, 10)
+    assert len(index) == len(values) == 0
@@ -0,0 +1,190 @@
+import time
+
+import numpy as np
+import pytest
+
+from pyaudio_wrapper import playback
+from pyaudio_wrapper.playback import PlaybackEngine
+
+RATE = 16000
+FRAMES_PER_BUFFER = 100
+
+class FakeStream(object):
+    """
+    An output stream whose callback is called by the test.
+    """
+
+    def __init__(self, stream_callback, **kwargs):
+        self.callback = stream_callback
+        self.active = False
+        self.closed = False
+        self.num_starts = 0
+
+    def get_output_latency(self):
+        return 0.
+
+    def start_stream(self):
+        self.active = True
+        self.num_starts += 1
+
+    def stop_stream(self):
+        self.active = False
+
+    def close(self):
+        self.closed = True
+
+    def pull(self, frame_count = FRAMES_PER_BUFFER):
+        """
+        Call the stream callback as PortAudio does.
+        """
+
+        assert self.active and not self.closed
+        data, flag = self.callback(None, frame_count, {}, 0)
+        if flag != playback.pyaudio.paContinue:
+            self.active = False
+        return bytes(data), flag
+
+class FakeAudio(object):
+
+    def __init__(self):
+        self.streams = []
+        self.ref_count = 0
+
+    def open(self, **kwargs):
+        self.streams.append(FakeStream(**kwargs))
+        return self.streams[-1]
+
+@pytest.fixture
+def audio(monkeypatch):
+    audio = FakeAudio()
+    def acquire_audio():
+        audio.ref_count += 1
+        return audio
+    def release_audio():
+        audio.ref_count -= 1
+    monkeypatch.setattr(playback, "acquire_audio", acquire_audio)
+    monkeypatch.setattr(playback, "release_audio", release_audio)
+    monkeypatch.setattr(playback, "get_default_output_device_info", lambda: {"index": 0})
+    return audio
+
+@pytest.fixture
+def engine(audio):
+    engine = PlaybackEngine(RATE, 2, 1, frames_per_buffer = FRAMES_PER_BUFFER, idle_timeout = 0.05)
+    yield engine
+    engine.close()
+
+def make_clip(num_frames, value):
+    return np.full(num_frames, value, dtype = np.int16).tobytes()
+
+def wait_until(condition, timeout = 2.):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out."
+        time.sleep(0.005)
+
+def test_play(audio, engine):
+    clip = make_clip(250, 1)
+    handle = engine.play(clip)
+    assert engine.playing and not handle.done
+    assert not handle.wait(0.01)
+
+    stream = audio.streams[0]
+    output = [stream.pull()[0] for _ in range(3)]
+    # The last buffer is completed with silence.
+    assert b"".join(output) == clip + make_clip(50, 0)
+    assert handle.position == len(clip)
+    assert handle.wait(1.)
+    assert handle.done and not handle.stopped
+    assert not engine.playing
+
+    assert stream.pull() == (make_clip(FRAMES_PER_BUFFER, 0), playback.pyaudio.paComplete)
+    assert audio.ref_count == 1
+
+def test_stop(audio, engine):
+    handle = engine.play(make_clip(1000, 1))
+    stream = audio.streams[0]
+    stream.pull()
+    handle.stop()
+    assert handle.wait(0.)
+    assert handle.stopped
+    assert handle.position == 2 * FRAMES_PER_BUFFER
+    assert stream.pull() == (make_clip(FRAMES_PER_BUFFER, 0), playback.pyaudio.paComplete)
+
+def test_queue(audio, engine):
+    first = engine.play(make_clip(150, 1))
+    second = engine.play(make_clip(150, 2), queue = True)
+    third = engine.play(make_clip(150, 3), queue = True)
+    # A queued clip is removed from the queue.
+    second.stop()
+    assert second.stopped and not first.done
+
+    stream = audio.streams[0]
+    output = b"".join(stream.pull()[0] for _ in range(3))
+    assert output == make_clip(150, 1) + make_clip(150, 3)
+    assert first.wait(1.) and third.wait(1.)
+    assert not first.stopped and not third.stopped
+    assert len(audio.streams) == 1
+
+def test_play_cancels_current(audio, engine):
+    first = engine.play(make_clip(1000, 1))
+    second = engine.play(make_clip(1000, 2), queue = True)
+    third = engine.play(make_clip(100, 3))
+    assert first.stopped and second.stopped and first.done and second.done
+
+    stream = audio.streams[0]
+    assert stream.pull()[0] == make_clip(100, 3)
+    assert third.wait(1.) and not third.stopped
+
+def test_idle_close(audio, engine):
+    handle = engine.play(make_clip(100, 1))
+    stream = audio.streams[0]
+    stream.pull()
+    assert stream.pull()[1] == playback.pyaudio.paComplete
+    assert handle.wait(1.)
+
+    # The stream is closed by the engine, not by the callback.
+    wait_until(lambda: engine.idle)
+    assert stream.closed and audio.ref_count == 0
+
+    # A new stream is opened for the next clip.
+    handle = engine.play(make_clip(100, 2))
+    assert len(audio.streams) == 2 and audio.ref_count == 1
+    assert audio.streams[1].pull()[0] == make_clip(100, 2)
+
+def test_restart_before_idle_close(audio):
+    engine = PlaybackEngine(RATE, 2, 1, frames_per_buffer = FRAMES_PER_BUFFER, idle_timeout = 0.2)
+    try:
+        engine.play(make_clip(100, 1))
+        stream = audio.streams[0]
+        stream.pull()
+        assert stream.pull()[1] == playback.pyaudio.paComplete
+
+        # Playing again before the timeout restarts the same stream...
+        engine.play(make_clip(100, 2))
+        assert stream.active and stream.num_starts == 2
+        # ...which is not closed once the timeout of the previous run expires.
+        time.sleep(0.3)
+        assert not engine.idle and not stream.closed
+        assert stream.pull()[0] == make_clip(100, 2)
+    finally:
+        engine.close()
+    assert stream.closed and audio.ref_count == 0
+
+def test_close(audio, engine):
+    handle = engine.play(make_clip(1000, 1))
+    engine.close()
+    assert engine.closed and handle.stopped
+    assert audio.streams[0].closed and audio.ref_count == 0
+    engine.close()
+    with pytest.raises(AssertionError):
+        engine.play(make_clip(100, 1))
+
+def test_end_time(audio, engine):
+    handle = engine.play(make_clip(1600, 1))
+    stream = audio.streams[0]
+    for _ in range(16):
+        stream.callback(None, FRAMES_PER_BUFFER, {"output_buffer_dac_time": 10.3, "current_time": 10.}, 0)
+    # The last frames are played 0.3 second after the callback.
+    assert not handle.done
+    assert not handle.wait(0.1)
+    assert handle.wait(1.)
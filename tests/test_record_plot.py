@@ -3,7 +3,6 @@
 import argparse
 from pyaudio_wrapper import Microphone, Recorder
 from pyaudio_wrapper.analyse import AudioAnalysor
-from pyaudio_wrapper.exceptions import PauseTimeout
 
 parser = argparse.ArgumentParser()
 parser.add_argument("-t", "--by_sec", dest = "by_sec", action = "store_true")
@@ -13,20 +12,27 @@ by_sec = args.by_sec
 
 r = Recorder()
 
-while True:
-    try:
-        with Microphone(channels = 2) as source:
-            print("Start recording")
-            audio_data = r.record(source, verbose = True)
+# The microphone stays open between takes: the utterances are yielded as
+# soon as they end. While the plot or the prompts are shown, the capture
+# goes on into the ring buffer of the source, which only holds 32 chunks
+# (about 5.9 seconds at 44.1 kHz). Past that, the audio is dropped.
+with Microphone(channels = 2, callback = True) as source:
+    print("Start recording")
+    dropped_frames = 0
+    for audio_data in r.listen(source, max_pause_time = 3):
+
+        if source.dropped_frames > dropped_frames:
+            print("{} frames were dropped while waiting.".format(source.dropped_frames - dropped_frames))
+            dropped_frames = source.dropped_frames
 
         a = AudioAnalysor(audio_data)
         a.plot(by_sec = by_sec)
         a.show()
-    except PauseTimeout:
-        to_break = raw_input("Break process? ([y]/n): ")
+
+        name = input("Do you want to save the file?\nEnter the file name (leave it blank if not): ")
+        if name != "":
+            audio_data.save("%s.wav" % name)
+
+        to_break = input("Break process? ([y]/n): ")
         if to_break.lower().startswith("y"):
             break
-
-    name = raw_input("Do you want to save the file?\nEnter the file name (leave it blank if not): ")
-    if name is not "":
-        audio_data.save("%s.wav" % name)
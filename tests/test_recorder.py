@@ -0,0 +1,173 @@
+import numpy as np
+import pytest
+
+from pyaudio_wrapper.recorder import Recorder
+from pyaudio_wrapper.exceptions import PauseTimeout
+from pyaudio_wrapper._source_abc import AudioSourceABC
+
+RATE = 16000
+FRAME_LENGTH = 320 # the 20 ms analysis frames of the segmenter
+
+class FakeSource(AudioSourceABC):
+    """
+    An audio source reading `samples`, then quiet noise forever.
+    """
+
+    def __init__(self, samples, chunk_size = 1024):
+
+        self.samples = samples
+        self.position = 0
+        self.__chunk_size = chunk_size
+        self.__rng = np.random.RandomState(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def read(self, chunk_size = None):
+
+        buffer = bytearray((chunk_size or self.CHUNK_SIZE) * self.FRAME_WIDTH)
+        self.readinto(buffer)
+        return bytes(buffer)
+
+    def readinto(self, buffer):
+
+        out = np.frombuffer(buffer, dtype = np.int16).reshape((-1, self.CHANNELS))
+        data = self.samples[self.position:self.position + len(out)]
+        out[:len(data)] = data
+        out[len(data):] = self.__rng.randint(-30, 30, (len(out) - len(data), self.CHANNELS))
+        self.position += len(out)
+        return len(out)
+
+    CHUNK_SIZE = property(lambda self: self.__chunk_size)
+    BIT_WIDTH = property(lambda self: 2)
+    CHANNELS = property(lambda self: self.samples.shape[1])
+    SAMPLE_RATE = property(lambda self: RATE)
+    FRAME_WIDTH = property(lambda self: 2 * self.CHANNELS)
+
+def make_samples(segments, num_frames, channels = 1):
+    """
+    Quiet noise with loud noise in the frame ranges of `segments`.
+    """
+
+    rng = np.random.RandomState(0)
+    samples = rng.randint(-30, 30, (num_frames, channels))
+    for start, stop in segments:
+        samples[start:stop] = rng.randint(-8000, 8000, (stop - start, channels))
+    return samples.astype(np.int16)
+
+def locate(samples, audio_data):
+    """
+    Return the frame range of `samples` that `audio_data` is a copy of.
+    """
+
+    frames = np.frombuffer(audio_data.BYTE_DATA, dtype = np.int16).reshape((-1, samples.shape[1]))
+    head = frames[:8]
+    for start in range(len(samples) - len(frames) + 1):
+        if np.array_equal(samples[start:start + 8], head) and \
+           np.array_equal(samples[start:start + len(frames)], frames):
+            return start, start + len(frames)
+    raise AssertionError("The audio data is not a part of the samples.")
+
+def assert_bounds(bounds, start, stop, chunk_size):
+    """
+    The onset and the end are exact if the chunks are made of whole
+    analysis frames, and within about one frame otherwise.
+    """
+
+    if chunk_size % FRAME_LENGTH == 0:
+        assert bounds == (start, stop)
+    else:
+        assert start - FRAME_LENGTH < bounds[0] <= start
+        assert stop <= bounds[1] < stop + 2 * FRAME_LENGTH
+
+@pytest.mark.parametrize("chunk_size", [160, 320, 1000, 3200, 8092])
+@pytest.mark.parametrize("channels", [1, 2])
+def test_record_onset_and_end(chunk_size, channels):
+    samples = make_samples([(16000, 32000)], 80000, channels)
+    source = FakeSource(samples, chunk_size)
+    audio_data = Recorder().record(source, max_pause_time = 2, energy_threshold = 1000, pre_roll = 0.3)
+    assert audio_data.CHANNELS == channels
+    assert_bounds(locate(samples, audio_data), 16000 - 4800, 32000 + 32000, chunk_size)
+
+@pytest.mark.parametrize("chunk_size", [160, 1000])
+def test_record_without_pre_roll(chunk_size):
+    samples = make_samples([(8000, 32000)], 80000)
+    audio_data = Recorder().record(FakeSource(samples, chunk_size), max_pause_time = 1,
+                                   energy_threshold = 1000, pre_roll = 0)
+    assert_bounds(locate(samples, audio_data), 8000, 32000 + 16000, chunk_size)
+
+def test_record_adaptive_threshold():
+    samples = make_samples([(8000, 32000)], 80000)
+    audio_data = Recorder().record(FakeSource(samples, 320), max_pause_time = 1, pre_roll = 0)
+    assert locate(samples, audio_data) == (8000, 48000)
+
+@pytest.mark.parametrize("chunk_size", [320, 1000])
+def test_record_max_duration(chunk_size):
+    samples = make_samples([(16000, 48000)], 80000)
+    audio_data = Recorder().record(FakeSource(samples, chunk_size), max_pause_time = 2,
+                                   energy_threshold = 1000, max_duration = 0.25, pre_roll = 0.1)
+    assert audio_data.num_frames == 4000
+    start, stop = locate(samples, audio_data)
+    assert 16000 - 1600 - FRAME_LENGTH < start <= 16000 - 1600
+
+@pytest.mark.parametrize("verbose", [False, True])
+def test_record_calibrated_noise_floor(capsys, verbose):
+    samples = make_samples([(24000, 40000)], 80000)
+    with pytest.warns(DeprecationWarning):
+        audio_data = Recorder().record(FakeSource(samples, 320), max_pause_time = 1, adjust_ambient_noise = True,
+                                       pre_roll = 0, verbose = verbose)
+    assert locate(samples, audio_data) == (24000, 56000)
+    # The prompts are printed only if verbose.
+    assert ("keep silent" in capsys.readouterr().out) == verbose
+
+def test_get_ambient_noice_energy(capsys):
+    recorder = Recorder()
+    recorder.set_source(FakeSource(np.full((16000, 1), 100, dtype = np.int16), 320))
+    with pytest.warns(DeprecationWarning):
+        assert recorder.get_ambient_noice_energy(1) == pytest.approx(100)
+    assert capsys.readouterr().out == ""
+
+def test_record_pause_timeout():
+    with pytest.raises(PauseTimeout):
+        Recorder().record(FakeSource(make_samples([], 100), 1024), max_pause_time = 1, energy_threshold = 1000)
+
+def test_record_rejects_threshold_with_calibration():
+    with pytest.raises(ValueError), pytest.warns(DeprecationWarning):
+        Recorder().record(FakeSource(make_samples([], 100)), adjust_ambient_noise = True,
+                          energy_threshold = 1000)
+
+def test_two_utterances_in_one_chunk():
+    samples = make_samples([(8000, 11840), (20160, 24000)], 80000, channels = 2)
+    source = FakeSource(samples, 40000)
+    listener = Recorder().listen(source, max_pause_time = 0.2, pre_roll = 0.1, energy_threshold = 1000)
+    first, second = next(listener), next(listener)
+    # Both utterances ended in the first chunk.
+    assert source.position == 40000
+    assert locate(samples, first) == (8000 - 1600, 11840 + 3200)
+    assert locate(samples, second) == (20160 - 1600, 24000 + 3200)
+
+@pytest.mark.parametrize("chunk_size", [320, 1000, 8092])
+def test_listen_onset_and_end(chunk_size):
+    segments = [(16000, 24000), (48000, 56000), (80000, 88000)]
+    samples = make_samples(segments, 120000)
+    listener = Recorder().listen(FakeSource(samples, chunk_size), max_pause_time = 0.5,
+                                 pre_roll = 0.2, energy_threshold = 1000)
+    for start, stop in segments:
+        assert_bounds(locate(samples, next(listener)), start - 3200, stop + 8000, chunk_size)
+
+@pytest.mark.parametrize("chunk_size", [320, 1000, 8092])
+def test_listen_max_duration(chunk_size):
+    samples = make_samples([(16000, 32000)], 80000)
+    listener = Recorder().listen(FakeSource(samples, chunk_size), max_pause_time = 0.5, pre_roll = 0.1,
+                                 energy_threshold = 1000, max_duration = 0.25)
+    utterances = [next(listener) for _ in range(4)]
+    assert [utterance.num_frames for utterance in utterances] == [4000] * 4
+
+    # The utterances cut at `max_duration` follow each other without a gap.
+    bounds = [locate(samples, utterance) for utterance in utterances]
+    for (_, stop), (start, _) in zip(bounds[:-1], bounds[1:]):
+        assert start == stop
+    assert 16000 - 1600 - FRAME_LENGTH < bounds[0][0] <= 16000 - 1600
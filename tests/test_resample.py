@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from pyaudio_wrapper.audio_data import AudioData
+from pyaudio_wrapper.resample import resample, StreamingResampler, _get_up_down
+
+def make_audio_data(num_frames, sample_rate = 44100, channels = 1, seed = 0):
+    samples = np.random.RandomState(seed).randint(-8000, 8000, (num_frames, channels)).astype(np.int16)
+    return AudioData(samples.tobytes(), sample_rate, 2, channels)
+
+def stream(audio_data, out_rate, frames_per_chunk):
+    resampler = StreamingResampler(audio_data.SAMPLE_RATE, out_rate)
+    chunks = [resampler.process(chunk) for chunk in audio_data.iter_chunks(frames_per_chunk)]
+    chunks.append(resampler.flush())
+    return b"".join(bytes(chunk.BYTE_DATA) for chunk in chunks)
+
+def test_get_up_down():
+    assert _get_up_down(44100, 16000) == (160, 441)
+    assert _get_up_down(16000, 48000) == (3, 1)
+
+def test_resample_same_rate():
+    array = np.arange(10.)
+    result = resample(array, 16000, 16000)
+    np.testing.assert_array_equal(result, array)
+    assert result is not array
+
+def test_resample_poly():
+    array = np.random.RandomState(0).randn(2, 4410)
+    np.testing.assert_allclose(resample(array, 44100, 16000),
+                               resample_poly(array, 160, 441, axis = -1, window = ("kaiser", 5.0)))
+
+def test_resample_sinc_length_and_tone():
+    rate, out_rate = 16000, 22050
+    t = np.arange(rate) / float(rate)
+    result = resample(np.sin(2 * np.pi * 440 * t), rate, out_rate, method = "sinc")
+    assert len(result) == out_rate
+    expected = np.sin(2 * np.pi * 440 * np.arange(out_rate) / float(out_rate))
+    # Away from the edges, the tone is preserved.
+    np.testing.assert_allclose(result[1000:-1000], expected[1000:-1000], atol = 1e-3)
+
+def test_resample_unknown_method():
+    with pytest.raises(ValueError):
+        resample(np.zeros(10), 16000, 8000, method = "linear")
+
+def test_streaming_resampler_matches_whole_resample():
+    audio_data = make_audio_data(10000, channels = 2)
+    expected = bytes(audio_data.convert_sample_rate(16000).BYTE_DATA)
+    for frames_per_chunk in [1, 37, 1024, 10000, 20000]:
+        assert stream(audio_data, 16000, frames_per_chunk) == expected
+
+def test_streaming_resampler_upsampling():
+    audio_data = make_audio_data(3000, sample_rate = 16000)
+    expected = bytes(audio_data.convert_sample_rate(44100).BYTE_DATA)
+    assert stream(audio_data, 44100, 512) == expected
+
+def test_streaming_resampler_rejects_other_rate():
+    resampler = StreamingResampler(44100, 16000)
+    with pytest.raises(ValueError):
+        resampler.process(make_audio_data(100, sample_rate = 16000))
+    assert resampler.flush() is None
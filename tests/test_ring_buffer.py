@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+
+from pyaudio_wrapper._ring_buffer import RingBuffer
+
+def test_write_and_read_wrap_around():
+    ring_buffer = RingBuffer(8)
+    assert ring_buffer.write(b"abcdef") == 6
+    assert ring_buffer.read(4) == b"abcd"
+    assert ring_buffer.write(b"ghijk") == 5
+    assert ring_buffer.available == 7
+    assert ring_buffer.read(100) == b"efghijk"
+    assert ring_buffer.available == 0
+
+def test_readinto():
+    ring_buffer = RingBuffer(8)
+    ring_buffer.write(b"abcdef")
+    ring_buffer.skip(4)
+    ring_buffer.write(b"ghijkl")
+    buffer = bytearray(5)
+    assert ring_buffer.readinto(buffer) == 5
+    assert buffer == b"efghi"
+    buffer = bytearray(5)
+    assert ring_buffer.readinto(buffer) == 3
+    assert buffer[:3] == b"jkl"
+
+def test_overflow_drops_newest_data():
+    ring_buffer = RingBuffer(8)
+    ring_buffer.write(b"abcdef")
+    assert ring_buffer.write(b"ghijk") == 2
+    assert ring_buffer.overflow_count == 1
+    assert ring_buffer.dropped_bytes == 3
+    assert ring_buffer.read(8) == b"abcdefgh"
+
+def test_skip_and_clear():
+    ring_buffer = RingBuffer(8)
+    ring_buffer.write(b"abcdef")
+    ring_buffer.skip(-1)
+    assert ring_buffer.available == 6
+    ring_buffer.skip(100)
+    assert ring_buffer.available == 0
+    ring_buffer.write(b"ab")
+    ring_buffer.clear()
+    assert ring_buffer.available == 0
+    assert ring_buffer.write(b"12345678") == 8
+
+def test_wait():
+    ring_buffer = RingBuffer(8)
+    assert not ring_buffer.wait(1, timeout = 0.01)
+    writer = threading.Timer(0.05, ring_buffer.write, (b"abcd",))
+    writer.start()
+    assert ring_buffer.wait(4, timeout = 5.)
+    writer.join()
+    assert ring_buffer.wait(0)
+
+def test_wait_larger_than_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(8).wait(9, timeout = 0.01)
+
+def test_threaded_producer_consumer():
+    ring_buffer = RingBuffer(64)
+    data = bytes(bytearray(i % 251 for i in range(20000)))
+
+    def produce():
+        for start in range(0, len(data), 16):
+            while ring_buffer.available > 48:
+                time.sleep(0.0001)
+            ring_buffer.write(data[start:start + 16])
+
+    producer = threading.Thread(target = produce)
+    producer.start()
+    received = []
+    while sum(map(len, received)) < len(data):
+        assert ring_buffer.wait(1, timeout = 5.)
+        received.append(ring_buffer.read(64))
+    producer.join()
+    assert b"".join(received) == data
+    assert ring_buffer.dropped_bytes == 0
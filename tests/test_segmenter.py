@@ -0,0 +1,78 @@
+import math
+import numpy as np
+
+from pyaudio_wrapper._segmenter import NoiseFloorTracker, UtteranceSegmenter
+
+def test_noise_floor_tracker():
+    tracker = NoiseFloorTracker(percentile = 10, adapt_rate = 3.)
+    assert tracker.floor is None
+    tracker.update(100., 0.)
+    assert abs(tracker.floor - 100.) < 1e-9
+
+    # Loud frames raise the floor slowly, quiet ones lower it quickly.
+    tracker.update(1e6, 0.1)
+    assert abs(math.log(tracker.floor / 100.) - 3. * 0.1 * 0.1) < 1e-12
+    tracker.update(1., 0.1)
+    assert abs(math.log(tracker.floor / 100.) - (0.03 - 0.27)) < 1e-12
+
+    # It does not pass the energy it moves to.
+    tracker.update(50., 10.)
+    assert abs(tracker.floor - 50.) < 1e-9
+
+def test_noise_floor_settles_at_the_percentile():
+    rng = np.random.RandomState(0)
+    tracker = NoiseFloorTracker(percentile = 10, initial = 1.)
+    energies = np.exp(rng.randn(20000))
+    for energy in energies:
+        tracker.update(energy, 0.02)
+    assert abs(math.log(tracker.floor) - np.log(np.percentile(energies, 10))) < 0.3
+
+def run(segmenter, samples, chunk_size):
+    """
+    Feed the mono 16 bits `samples` chunk by chunk. The reserved region may
+    be shorter than a chunk, the next one then starts after it.
+    """
+
+    utterances = []
+    position = 0
+    while position < len(samples):
+        region = segmenter.reserve(min(chunk_size, len(samples) - position))
+        num_frames = len(region) // 2
+        region[:] = samples[position:position + num_frames].tobytes()
+        position += num_frames
+        utterances.extend(segmenter.process())
+    return utterances
+
+def test_segmenter_states():
+    samples = np.zeros(32000, dtype = np.int16)
+    samples[8000:16000] = 8000
+    segmenter = UtteranceSegmenter(16000, 2, 1, energy_threshold = 1000, hangover = 0.1)
+    assert not segmenter.in_speech and segmenter.energy_threshold == 1000
+    assert segmenter.noise_floor is None
+
+    utterances = run(segmenter, samples[:9600], 800)
+    assert utterances == [] and segmenter.in_speech
+    utterances = run(segmenter, samples[9600:], 800)
+    # 8000 loud frames and 1600 frames of hangover, in bytes.
+    assert [len(utterance) for utterance in utterances] == [19200]
+    assert not segmenter.in_speech and not segmenter.truncated
+
+def test_segmenter_truncated():
+    samples = np.zeros(32000, dtype = np.int16)
+    samples[8000:16000] = 8000
+    segmenter = UtteranceSegmenter(16000, 2, 1, energy_threshold = 1000, hangover = 0.1, max_duration = 0.34)
+    # The chunks are made of whole analysis frames of 320 frames.
+    utterances = run(segmenter, samples, 960)
+    # 5440 frames, then the 2560 loud frames left and the hangover.
+    assert [len(utterance) for utterance in utterances] == [10880, 8320]
+    assert not segmenter.truncated
+    assert bytes(utterances[0]) == samples[8000:13440].tobytes()
+    assert bytes(utterances[1]) == samples[13440:17600].tobytes()
+
+def test_segmenter_adaptive_threshold():
+    segmenter = UtteranceSegmenter(16000, 2, 1, min_threshold_db = -70.)
+    assert segmenter.energy_threshold is None
+    run(segmenter, np.zeros(1600, dtype = np.int16), 320)
+    # Digital silence: the threshold is the minimum.
+    assert abs(segmenter.energy_threshold - 32768 * 10 ** (-70 / 20.)) < 1e-9
+    assert segmenter.noise_floor < segmenter.energy_threshold
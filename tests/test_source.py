@@ -0,0 +1,264 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pyaudio_wrapper import devices
+from pyaudio_wrapper.source import AudioSource
+from pyaudio_wrapper.recorder import Recorder
+
+RATE = 16000
+
+class FakeInputStream(object):
+    """
+    An input stream delivering `FakeAudio.samples`, then quiet noise. In
+    callback mode a thread calls the callback every `FakeAudio.interval`
+    seconds, as PortAudio does.
+    """
+
+    def __init__(self, channels, frames_per_buffer, stream_callback = None, **kwargs):
+
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.callback = stream_callback
+        self.position = 0
+        self.active = False
+        self.closed = False
+        self.__thread = None
+        self.__rng = np.random.RandomState(1)
+
+    def __next_frames(self, num_frames):
+
+        samples = FakeAudio.samples[self.position:self.position + num_frames]
+        noise = self.__rng.randint(-30, 30, (num_frames - len(samples), self.channels)).astype(np.int16)
+        self.position += num_frames
+        return np.concatenate([samples, noise]).tobytes()
+
+    def start_stream(self):
+
+        self.active = True
+        if self.callback is not None:
+            self.__thread = threading.Thread(target = self.__run)
+            self.__thread.daemon = True
+            self.__thread.start()
+
+    def __run(self):
+
+        while self.active:
+            self.callback(self.__next_frames(self.frames_per_buffer), self.frames_per_buffer, {}, 0)
+            time.sleep(FakeAudio.interval)
+
+    def is_active(self):
+        return self.active
+
+    def stop_stream(self):
+
+        self.active = False
+        if self.__thread is not None:
+            self.__thread.join()
+
+    def close(self):
+        self.closed = True
+
+    def read(self, num_frames, exception_on_overflow = True):
+
+        assert self.callback is None and self.active
+        return self.__next_frames(num_frames)
+
+class FakeAudio(object):
+
+    samples = None
+    interval = 0.
+    streams = []
+
+    def terminate(self):
+        pass
+
+    def get_device_count(self):
+        return 1
+
+    def get_device_info_by_index(self, index):
+        return {"index": index, "maxInputChannels": 2, "defaultSampleRate": float(RATE)}
+
+    def get_default_input_device_info(self):
+        return self.get_device_info_by_index(0)
+
+    def get_default_output_device_info(self):
+        raise IOError("No Default Output Device Available")
+
+    def get_format_from_width(self, width):
+        return devices.pyaudio.get_format_from_width(width)
+
+    def open(self, **kwargs):
+
+        assert kwargs["input"] and not kwargs["start"]
+        FakeAudio.streams.append(FakeInputStream(**kwargs))
+        return FakeAudio.streams[-1]
+
+@pytest.fixture(autouse = True)
+def fake_audio(monkeypatch):
+    FakeAudio.samples = make_ramp(RATE)
+    FakeAudio.interval = 0.001
+    FakeAudio.streams = []
+    monkeypatch.setattr(devices.pyaudio, "PyAudio", FakeAudio)
+    monkeypatch.setattr(devices, "_audio", None)
+    monkeypatch.setattr(devices, "_ref_count", 0)
+    monkeypatch.setattr(devices, "_device_table", None)
+
+def make_ramp(num_frames, channels = 1):
+    """
+    Samples whose order can be checked.
+    """
+
+    samples = np.arange(num_frames * channels) % 20000
+    return samples.astype(np.int16).reshape((-1, channels))
+
+def make_samples(segments, num_frames):
+    """
+    Quiet noise with loud noise in the frame ranges of `segments`.
+    """
+
+    rng = np.random.RandomState(0)
+    samples = rng.randint(-30, 30, (num_frames, 1))
+    for start, stop in segments:
+        samples[start:stop] = rng.randint(-8000, 8000, (stop - start, 1))
+    return samples.astype(np.int16)
+
+def locate(samples, audio_data):
+
+    frames = np.frombuffer(audio_data.BYTE_DATA, dtype = np.int16).reshape((-1, 1))
+    for start in range(len(samples) - len(frames) + 1):
+        if np.array_equal(samples[start:start + len(frames)], frames):
+            return start, start + len(frames)
+    raise AssertionError("The audio data is not a part of the samples.")
+
+def test_async_with_restores_callback():
+    source = AudioSource(0, RATE, 2, chunk_size = 160)
+
+    async def main():
+        async with source:
+            assert source.callback
+            assert FakeAudio.streams[-1].callback is not None
+            assert devices._ref_count == 1
+    asyncio.run(main())
+
+    assert not source.callback
+    assert source.audio is None
+    assert FakeAudio.streams[-1].closed and devices._ref_count == 0
+
+    # The source reads by blocking reads again.
+    with source:
+        assert FakeAudio.streams[-1].callback is None
+        assert source.read() == make_ramp(160).tobytes()
+
+@pytest.mark.parametrize("num_frames", [160, 100, 1000])
+def test_read_async(num_frames):
+    FakeAudio.interval = 0.005
+    source = AudioSource(0, RATE, 2, chunk_size = 160, buffer_chunks = 4)
+
+    async def main():
+        async with source:
+            # Reads larger than the ring buffer are filled piece by piece.
+            chunks = [await source.read_async(num_frames) for _ in range(4)]
+            buffer = bytearray(num_frames * 2 + 1)
+            assert await source.readinto_async(buffer) == num_frames
+        assert all(type(chunk) is bytes for chunk in chunks)
+        return b"".join(chunks) + bytes(buffer[:-1])
+    data = asyncio.run(main())
+
+    assert data == make_ramp(5 * num_frames).tobytes()
+    assert source.dropped_frames == 0
+
+@pytest.mark.parametrize("num_frames", [160, 100, 1000])
+def test_read_callback(num_frames):
+    FakeAudio.interval = 0.005
+    source = AudioSource(0, RATE, 2, chunk_size = 160, callback = True, buffer_chunks = 4)
+    with source:
+        # Reads larger than the ring buffer are joined piece by piece.
+        chunks = [source.read(num_frames) for _ in range(4)]
+        buffer = bytearray(num_frames * 2)
+        assert source.readinto(buffer) == num_frames
+
+    assert all(type(chunk) is bytes for chunk in chunks)
+    assert b"".join(chunks) + bytes(buffer) == make_ramp(5 * num_frames).tobytes()
+    assert source.dropped_frames == 0
+
+def test_read_async_outside_async_with():
+    source = AudioSource(0, RATE, 2, chunk_size = 160, callback = True)
+    with source:
+        with pytest.raises(RuntimeError):
+            asyncio.run(source.read_async())
+
+def test_stream():
+    source = AudioSource(0, RATE, 2, chunk_size = 160, channels = 2)
+    FakeAudio.samples = make_ramp(RATE, 2)
+
+    async def main():
+        chunks = []
+        async with source:
+            async for chunk in source.stream():
+                chunks.append(chunk)
+                if len(chunks) == 10:
+                    break
+        return chunks
+    chunks = asyncio.run(main())
+
+    assert all(len(chunk) == 160 * 4 for chunk in chunks)
+    assert b"".join(chunks) == make_ramp(1600, 2).tobytes()
+
+def test_event_loop_not_blocked():
+    # 0.2 second of data is delivered in real time.
+    FakeAudio.interval = 0.01
+    source = AudioSource(0, RATE, 2, chunk_size = 160)
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.005)
+
+    async def main():
+        async with source:
+            ticker = asyncio.ensure_future(tick())
+            data = await source.read_async(3200)
+            ticker.cancel()
+        return data
+    data = asyncio.run(main())
+
+    assert data == make_ramp(3200).tobytes()
+    # The other coroutines kept running while waiting for the data.
+    assert len(ticks) > 10
+
+def test_record_async():
+    FakeAudio.samples = make_samples([(8000, 24000)], 64000)
+    source = AudioSource(0, RATE, 2, chunk_size = 1600, buffer_chunks = 256)
+
+    async def main():
+        async with source:
+            return await Recorder().record_async(source, max_pause_time = 0.5, energy_threshold = 1000,
+                                                 pre_roll = 0)
+    audio_data = asyncio.run(main())
+
+    assert locate(FakeAudio.samples, audio_data) == (8000, 24000 + 8000)
+    assert not source.callback
+
+def test_listen_async():
+    segments = [(16000, 24000), (48000, 56000)]
+    FakeAudio.samples = make_samples(segments, 80000)
+    source = AudioSource(0, RATE, 2, chunk_size = 1600, buffer_chunks = 256)
+
+    async def main():
+        utterances = []
+        async with source:
+            async for utterance in Recorder().listen_async(source, max_pause_time = 0.5, pre_roll = 0.2,
+                                                           energy_threshold = 1000):
+                utterances.append(utterance)
+                if len(utterances) == 2:
+                    break
+        return utterances
+    utterances = asyncio.run(main())
+
+    for (start, stop), utterance in zip(segments, utterances):
+        assert locate(FakeAudio.samples, utterance) == (start - 3200, stop + 8000)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from pyaudio_wrapper._utils import _LRUCache
+
+def test_lru_cache_get_put():
+    cache = _LRUCache(1000)
+    value = np.zeros(10)
+    cache.put("a", value)
+    assert "a" in cache and len(cache) == 1
+    assert cache.get("a") is value
+    assert cache.get("b") is None
+    assert cache.get("b", 1) == 1
+    assert cache.nbytes == 80
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = _LRUCache(250)
+    cache.put("a", np.zeros(10))
+    cache.put("b", np.zeros(10))
+    cache.put("c", np.zeros(10))
+    cache.get("a")
+    cache.put("d", np.zeros(10))
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.nbytes == 240
+
+def test_lru_cache_nested_values():
+    cache = _LRUCache(1000)
+    cache.put("a", (np.zeros(10), [np.zeros(5, dtype = np.int16), None]))
+    assert cache.nbytes == 90
+
+def test_lru_cache_replace_and_too_large():
+    cache = _LRUCache(100)
+    cache.put("a", np.zeros(10))
+    cache.put("a", np.zeros(5))
+    assert cache.nbytes == 40 and len(cache) == 1
+    cache.put("b", np.zeros(20))
+    assert "b" not in cache and "a" in cache
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
@@ -0,0 +1,63 @@
+import numpy as np
+
+from pyaudio_wrapper.audio_data import AudioData
+from pyaudio_wrapper.vad import detect_voice_segments, split_on_silence, _merge_runs
+
+RATE = 16000
+
+def make_audio_data(segments, num_frames, channels = 1):
+    """
+    Quiet noise with loud noise in the frame ranges of `segments`.
+    """
+
+    rng = np.random.RandomState(0)
+    samples = rng.randint(-50, 50, (num_frames, channels))
+    for start, stop in segments:
+        samples[start:stop] = rng.randint(-8000, 8000, (stop - start, channels))
+    return AudioData(samples.astype(np.int16).tobytes(), RATE, 2, channels)
+
+def test_merge_runs():
+    starts, stops = _merge_runs(np.array([0, 10, 30]), np.array([5, 20, 40]), 6)
+    np.testing.assert_array_equal(starts, [0, 30])
+    np.testing.assert_array_equal(stops, [20, 40])
+    starts, stops = _merge_runs(np.array([], dtype = int), np.array([], dtype = int), 1)
+    assert len(starts) == len(stops) == 0
+
+def test_detect_voice_segments():
+    audio_data = make_audio_data([(3200, 8000), (16000, 19200)], 32000)
+    segments = detect_voice_segments(audio_data, threshold = 1000, frame_ms = 20, min_silence_ms = 300)
+    np.testing.assert_array_equal(segments, [[3200, 8000], [16000, 19200]])
+    assert segments.dtype == np.intp
+
+def test_short_silence_does_not_split():
+    audio_data = make_audio_data([(3200, 8000), (9600, 12800)], 32000, channels = 2)
+    segments = detect_voice_segments(audio_data, threshold = 1000, min_silence_ms = 300)
+    np.testing.assert_array_equal(segments, [[3200, 12800]])
+    segments = detect_voice_segments(audio_data, threshold = 1000, min_silence_ms = 50)
+    np.testing.assert_array_equal(segments, [[3200, 8000], [9600, 12800]])
+
+def test_min_voice_and_padding():
+    audio_data = make_audio_data([(320, 640), (16000, 24000)], 32000)
+    segments = detect_voice_segments(audio_data, threshold = 1000, min_voice_ms = 100, padding_ms = 100)
+    np.testing.assert_array_equal(segments, [[14400, 25600]])
+    # Padding does not run past the ends.
+    audio_data = make_audio_data([(0, 3200), (28800, 32000)], 32000)
+    segments = detect_voice_segments(audio_data, threshold = 1000, padding_ms = 100)
+    np.testing.assert_array_equal(segments, [[0, 4800], [27200, 32000]])
+
+def test_default_threshold():
+    audio_data = make_audio_data([(3200, 8000)], 32000)
+    np.testing.assert_array_equal(detect_voice_segments(audio_data), [[3200, 8000]])
+
+def test_no_voice():
+    audio_data = make_audio_data([], 16000)
+    assert detect_voice_segments(audio_data, threshold = 1000).shape == (0, 2)
+    assert list(split_on_silence(audio_data, threshold = 1000)) == []
+    assert detect_voice_segments(make_audio_data([], 0)).shape == (0, 2)
+
+def test_split_on_silence_returns_views():
+    audio_data = make_audio_data([(3200, 8000), (16000, 19200)], 32000, channels = 2)
+    pieces = list(split_on_silence(audio_data, threshold = 1000))
+    assert [piece.num_frames for piece in pieces] == [4800, 3200]
+    np.testing.assert_array_equal(pieces[1].data, audio_data.data[:, 16000:19200])
+    assert isinstance(pieces[0].BYTE_DATA, memoryview)
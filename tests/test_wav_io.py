@@ -0,0 +1,147 @@
+import wave
+import numpy as np
+import pytest
+
+from pyaudio_wrapper.audio_data import AudioData, WavAudioData, WavFileAudioData, WavWriter
+
+def make_wav_audio_data(num_frames, channels = 1, bit_width = 2, seed = 0):
+    rng = np.random.RandomState(seed)
+    if bit_width == 1:
+        # 8 bits wav files are unsigned.
+        samples = rng.randint(0, 256, (num_frames, channels)).astype(np.uint8)
+        return WavAudioData(samples.tobytes(), 16000, 1, channels, np.uint8)
+    dtype = {2: np.int16, 4: np.int32}[bit_width]
+    samples = rng.randint(-8000, 8000, (num_frames, channels)).astype(dtype)
+    return WavAudioData(samples.tobytes(), 16000, bit_width, channels)
+
+def write_with_wave(fname, audio_data):
+
+    wav_file = wave.open(fname, "wb")
+    wav_file.setnchannels(audio_data.CHANNELS)
+    wav_file.setsampwidth(audio_data.BIT_WIDTH)
+    wav_file.setframerate(audio_data.SAMPLE_RATE)
+    wav_file.writeframes(audio_data.BYTE_DATA)
+    wav_file.close()
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("bit_width", [1, 2, 4])
+def test_wav_file_audio_data(tmp_path, use_mmap, channels, bit_width):
+    audio_data = make_wav_audio_data(1001, channels, bit_width)
+    fname = str(tmp_path / "audio.wav")
+    write_with_wave(fname, audio_data)
+
+    wav_audio = WavFileAudioData(fname, use_mmap = use_mmap)
+    assert (wav_audio.SAMPLE_RATE, wav_audio.BIT_WIDTH, wav_audio.CHANNELS) == (16000, bit_width, channels)
+    assert wav_audio.dtype == audio_data.dtype
+    assert bytes(wav_audio.BYTE_DATA) == audio_data.BYTE_DATA
+    np.testing.assert_array_equal(wav_audio.data, audio_data.data)
+
+    # Slices are no longer file audio data, but still share its buffer.
+    piece = wav_audio._frame_slice(100, 200)
+    assert type(piece) is WavAudioData
+    assert np.shares_memory(piece.data, wav_audio.data)
+    np.testing.assert_array_equal(piece.data, audio_data.data[..., 100:200])
+    del piece, wav_audio
+
+def test_wav_file_audio_data_mmap(tmp_path):
+    audio_data = make_wav_audio_data(1000)
+    fname = str(tmp_path / "audio.wav")
+    write_with_wave(fname, audio_data)
+    wav_audio = WavFileAudioData(fname, use_mmap = True)
+    base = wav_audio.data
+    while not isinstance(base, np.memmap):
+        # Follow views (and the memoryview of `BYTE_DATA`) back to the mapping.
+        base = base.obj if isinstance(base, memoryview) else base.base
+        assert base is not None
+
+def test_iter_chunks():
+    audio_data = make_wav_audio_data(1000, channels = 2)
+    chunks = list(audio_data.iter_chunks(300))
+    assert [chunk.num_frames for chunk in chunks] == [300, 300, 300, 100]
+    for chunk in chunks:
+        assert np.shares_memory(chunk.data, audio_data.data)
+    assert b"".join(chunk.BYTE_DATA for chunk in chunks) == audio_data.BYTE_DATA
+    assert AudioData.concat(chunks).BYTE_DATA == audio_data.BYTE_DATA
+
+    with pytest.raises(AssertionError):
+        list(audio_data.iter_chunks(0))
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_wav_writer(tmp_path, use_mmap):
+    audio_data = make_wav_audio_data(1000, channels = 2)
+    fname = str(tmp_path / "audio.wav")
+    write_with_wave(fname, audio_data)
+    out_fname = str(tmp_path / "out.wav")
+
+    wav_audio = WavFileAudioData(fname, use_mmap = use_mmap)
+    with WavWriter(out_fname, 16000, 2, 2) as writer:
+        assert writer.fname == out_fname
+        for chunk in wav_audio.iter_chunks(256):
+            writer.write(chunk)
+    assert writer.closed
+    del chunk, wav_audio
+
+    out_audio = WavFileAudioData(out_fname)
+    assert (out_audio.SAMPLE_RATE, out_audio.BIT_WIDTH, out_audio.CHANNELS) == (16000, 2, 2)
+    assert bytes(out_audio.BYTE_DATA) == audio_data.BYTE_DATA
+
+    # The header is patched with the final sizes.
+    wav_file = wave.open(out_fname, "rb")
+    assert wav_file.getnframes() == 1000
+    wav_file.close()
+
+def test_wav_writer_errors(tmp_path):
+    audio_data = make_wav_audio_data(100)
+    writer = WavWriter(str(tmp_path / "out.wav"), 16000, 2, 1)
+    with pytest.raises(ValueError):
+        writer.write(audio_data.BYTE_DATA)
+    with pytest.raises(ValueError):
+        writer.write(make_wav_audio_data(100, channels = 2))
+    with pytest.raises(ValueError):
+        writer.write(make_wav_audio_data(100, bit_width = 1))
+    writer.write(audio_data)
+    writer.close()
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.write(audio_data)
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("bit_width", [1, 2, 4])
+def test_raw_wav_data(tmp_path, channels, bit_width):
+    audio_data = make_wav_audio_data(1001, channels, bit_width)
+    fname = str(tmp_path / "audio.wav")
+    write_with_wave(fname, audio_data)
+    with open(fname, "rb") as wav_file:
+        expected = wav_file.read()
+
+    assert len(audio_data.wav_header) == 44
+    assert audio_data.raw_wav_data == expected
+    with pytest.raises(RuntimeError):
+        audio_data.raw_wav_data = expected
+
+def test_wav_header_cached():
+    audio_data = make_wav_audio_data(1000)
+    assert audio_data.wav_header is audio_data.wav_header
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_save(tmp_path, use_mmap):
+    audio_data = make_wav_audio_data(1000, channels = 2)
+    fname = str(tmp_path / "audio.wav")
+    audio_data.save(fname)
+    with open(fname, "rb") as wav_file:
+        assert wav_file.read() == audio_data.raw_wav_data
+
+    wav_audio = WavFileAudioData(fname, use_mmap = use_mmap)
+    assert bytes(wav_audio.BYTE_DATA) == audio_data.BYTE_DATA
+    np.testing.assert_array_equal(wav_audio.data, audio_data.data)
+
+    # Saving a slice of a wav file writes only the sliced frames.
+    out_fname = str(tmp_path / "out.wav")
+    wav_audio[10:30].save(out_fname)
+    del wav_audio
+    out_audio = WavFileAudioData(out_fname)
+    np.testing.assert_array_equal(out_audio.data, audio_data.data[:, 160:480])
+
+    with pytest.raises(AssertionError):
+        audio_data.save(str(tmp_path / "audio.mp3"))